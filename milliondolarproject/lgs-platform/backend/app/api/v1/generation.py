@@ -110,21 +110,19 @@ async def generate_single_question(
             user_id=str(current_user.id)
         )
         
-        question = await generator.generate_question(generation_request)
-        
-        if 'error' in question:
-            raise HTTPException(status_code=500, detail="Question generation failed")
-        
-        # Cache the generated question
-        await cache_manager.cache_question(
-            question,
+        # Concurrent misses for the same key share one generation, which is cached on success
+        question = await cache_manager.generate_once(
             request.subject,
             request.topic,
             request.learning_outcome,
             request.difficulty.value,
+            lambda: generator.generate_question(generation_request),
             ttl=3600  # 1 hour TTL
         )
         
+        if 'error' in question:
+            raise HTTPException(status_code=500, detail="Question generation failed")
+        
         return {
             'success': True,
             'question': question,
@@ -417,20 +415,18 @@ async def generate_adaptive_question(
             user_id=str(current_user.id)
         )
         
-        question = await generator.generate_question(generation_request)
-        
-        if 'error' in question:
-            raise HTTPException(status_code=500, detail="Adaptive question generation failed")
-        
-        # Cache the generated question
-        await cache_manager.cache_question(
-            question,
+        # Concurrent misses for the same key share one generation, which is cached on success
+        question = await cache_manager.generate_once(
             adaptive_request.subject,
             adaptive_request.topic,
             adaptive_request.learning_outcome,
-            adaptive_request.difficulty.value
+            adaptive_request.difficulty.value,
+            lambda: generator.generate_question(generation_request)
         )
         
+        if 'error' in question:
+            raise HTTPException(status_code=500, detail="Adaptive question generation failed")
+        
         return {
             'success': True,
             'question': question,
@@ -589,7 +585,7 @@ async def get_student_adaptive_profile(
                 'current_preference': current,
                 'adjustment_needed': should_adjust,
                 'improvement_trend': student_profile.improvement_trend.get(subject, 'stable'),
-                'recent_performance': student_profile.recent_performance.get(subject, [])[-5:]  # Last 5
+                'recent_performance': list(student_profile.recent_performance.get(subject, ()))[-5:]  # Last 5
             }
         
         return {
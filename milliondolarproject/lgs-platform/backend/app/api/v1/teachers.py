@@ -4,10 +4,15 @@ Provides all teacher dashboard views and analytics capabilities
 """
 
 from typing import List, Dict, Any, Optional
+from collections import Counter
+from types import MappingProxyType
+import asyncio
+import json
 import time
 
 try:
     from fastapi import APIRouter, Depends, HTTPException
+    from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
     FASTAPI_AVAILABLE = True
 except ImportError:
     FASTAPI_AVAILABLE = False
@@ -15,6 +20,12 @@ except ImportError:
     Depends = None
     HTTPException = None
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from app.core.teacher_analytics import (
     TeacherAnalyticsEngine, 
     QuestionSubmission,
@@ -32,6 +43,7 @@ from app.models.teacher_responses import (
     VideoRecommendationResponse,
     MiniTestResponse,
     AlertResponse,
+    AlertListResponse,
     SubmissionRequest,
     TeacherAccessRequest,
     MiniTestRequest,
@@ -39,9 +51,154 @@ from app.models.teacher_responses import (
     AlertResolutionRequest
 )
 
-# Mock auth dependency for standalone operation
+# Mock auth dependency for standalone operation; a read-only mapping lets every
+# request share one instance instead of allocating a fresh dict
+_MOCK_USER = MappingProxyType({"user_id": "teacher_001", "role": "teacher"})
+
 def get_current_user():
-    return {"user_id": "teacher_001", "role": "teacher"}
+    return _MOCK_USER
+
+# Short-lived caches for the heavy dashboard views. Keys embed the engine's
+# data versions, so a new submission makes older entries unreachable and the
+# TTL only bounds how long an unused entry is kept around.
+VIEW_CACHE_TTL_SECONDS = 15
+VIEW_CACHE_MAX_SIZE = 1024
+
+_overview_cache: Dict[tuple, tuple] = {}
+_profile_cache: Dict[tuple, tuple] = {}
+_lo_analysis_cache: Dict[tuple, tuple] = {}
+
+def _cached_view(cache: Dict[tuple, tuple], key: tuple, compute):
+    """Return a cached view for key, computing and storing it on a miss"""
+    now = time.time()
+    entry = cache.get(key)
+    if entry is not None and now - entry[0] < VIEW_CACHE_TTL_SECONDS:
+        return entry[1]
+    
+    value = compute()
+    
+    if len(cache) >= VIEW_CACHE_MAX_SIZE:
+        expired = [k for k, (stored_at, _) in cache.items() if now - stored_at >= VIEW_CACHE_TTL_SECONDS]
+        for k in expired:
+            del cache[k]
+        if len(cache) >= VIEW_CACHE_MAX_SIZE:
+            del cache[next(iter(cache))]  # Oldest insertion
+    
+    cache[key] = (now, value)
+    return value
+
+# Alert listings longer than this are streamed instead of built in memory
+ALERT_STREAM_THRESHOLD = 500
+
+def _alert_payload(alert: ClassAlert) -> Dict[str, Any]:
+    """Serialize an alert for the alerts listing"""
+    return {
+        "alert_id": alert.alert_id,
+        "alert_type": alert.alert_type,
+        "student_id": alert.student_id,
+        "class_id": alert.class_id,
+        "subject": alert.subject,
+        "topic": alert.topic,
+        "learning_outcome": alert.learning_outcome,
+        "severity": alert.severity,
+        "message": alert.message,
+        "created_at": alert.created_at,
+        "recommended_actions": alert.recommended_actions
+    }
+
+def _encode_json(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+def _stream_alerts(alerts: List[ClassAlert], severity_counts: Counter):
+    """Yield the alerts listing as JSON chunks, one alert at a time"""
+    yield b'{"status":"success","alerts":['
+    for index, alert in enumerate(alerts):
+        chunk = _encode_json(_alert_payload(alert))
+        yield chunk if index == 0 else b"," + chunk
+    yield b'],"total_count":' + _encode_json(len(alerts))
+    yield b',"critical_count":' + _encode_json(severity_counts["critical"])
+    yield b',"high_count":' + _encode_json(severity_counts["high"]) + b"}"
+
+def _compute_class_trends(analytics: TeacherAnalyticsEngine, class_id: str, student_ids: List[str],
+                          cutoff_time: float, subject: Optional[str]):
+    """Aggregate a class's recent submissions; returns None when there is no data"""
+    student_ids = set(student_ids)
+    submissions = [
+        s for s in analytics.submissions 
+        if s.student_id in student_ids 
+        and s.class_id == class_id 
+        and s.timestamp >= cutoff_time
+        and (not subject or s.subject == subject)
+    ]
+    
+    if not submissions:
+        return None
+    
+    # Calculate daily trends
+    daily_trends = analytics._calculate_class_7day_trend(submissions)
+    
+    # Calculate subject breakdown
+    subject_performance = analytics._calculate_subject_performance(submissions)
+    
+    return len(submissions), daily_trends, subject_performance
+
+def _populate_sample_submissions(analytics: TeacherAnalyticsEngine, teacher_id: str,
+                                  students: List[str]) -> List[QuestionSubmission]:
+    """Generate and record demo submissions with various performance patterns"""
+    import random
+    
+    sample_submissions = []
+    current_time = time.time()
+
+    topics = [
+        ("Matematik", "Rasyonel Sayılar", "Rasyonel sayıları tanır"),
+        ("Matematik", "Cebirsel İfadeler", "Cebirsel ifadeleri sadeleştirir"),
+        ("Fen Bilimleri", "Hücre Bölünmesi", "Mitoz bölünme evrelerini sıralar"),
+        ("Fen Bilimleri", "Kalıtım", "Kalıtım kanunlarını açıklar")
+    ]
+
+    for i in range(200):  # Generate 200 sample submissions
+        student_id = random.choice(students)
+        subject, topic, lo = random.choice(topics)
+        class_id = "class_8A" if student_id in ["student_001", "student_002", "student_003"] else "class_8B"
+
+        # Create performance patterns for different students
+        if student_id == "student_001":  # High performer
+            is_correct = random.random() < 0.85
+        elif student_id == "student_002":  # Struggling in math
+            is_correct = random.random() < 0.4 if subject == "Matematik" else random.random() < 0.75
+        elif student_id == "student_003":  # Declining performance
+            is_correct = random.random() < max(0.3, 0.8 - (i / 200) * 0.5)
+        else:  # Average performers
+            is_correct = random.random() < 0.65
+
+        submission = QuestionSubmission(
+            submission_id=f"sub_{i:03d}_{student_id}",
+            student_id=student_id,
+            question_id=f"q_{random.randint(1000, 9999)}",
+            class_id=class_id,
+            subject=subject,
+            topic=topic,
+            learning_outcome=lo,
+            difficulty=random.choice(["KOLAY", "ORTA", "ZOR"]),
+            selected_answer=random.choice(["A", "B", "C", "D"]),
+            correct_answer=random.choice(["A", "B", "C", "D"]),
+            is_correct=is_correct,
+            time_spent_seconds=random.randint(30, 300),
+            timestamp=current_time - random.randint(0, 14 * 24 * 60 * 60),  # Last 14 days
+            session_id=f"session_{random.randint(100, 999)}",
+            teacher_id=teacher_id
+        )
+
+        sample_submissions.append(submission)
+
+    # Process all submissions
+    for submission in sample_submissions:
+        analytics.record_question_submission(submission)
+    
+    return sample_submissions
 
 if not FASTAPI_AVAILABLE:
     # Provide standalone functions for testing
@@ -49,56 +206,44 @@ if not FASTAPI_AVAILABLE:
         return None
     router = create_mock_router()
 else:
-    router = APIRouter(tags=["teachers"])
+    # Dashboard payloads are large and read-heavy; orjson encodes them much faster
+    router = APIRouter(
+        tags=["teachers"],
+        default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+    )
 
 # Define all route handlers only if FastAPI is available
 if FASTAPI_AVAILABLE:
     @router.post("/classes/{class_id}/submissions")
     async def record_student_submission(
-    class_id: str,
-    submission_data: Dict[str, Any],
-    current_user: Dict = Depends(get_current_user),
-    analytics: TeacherAnalyticsEngine = Depends(get_teacher_analytics)
-):
-    """Record a student's question submission for real-time analysis"""
+        class_id: str,
+        submission_data: Dict[str, Any],
+        current_user: Dict = Depends(get_current_user),
+        analytics: TeacherAnalyticsEngine = Depends(get_teacher_analytics)
+    ):
+        """Record a student's question submission for real-time analysis"""
     
-    teacher_id = current_user["user_id"]
+        teacher_id = current_user["user_id"]
     
-    # Create submission object
-    submission = QuestionSubmission(
-        submission_id=submission_data["submission_id"],
-        student_id=submission_data["student_id"],
-        question_id=submission_data["question_id"],
-        class_id=class_id,
-        subject=submission_data["subject"],
-        topic=submission_data["topic"],
-        learning_outcome=submission_data["learning_outcome"],
-        difficulty=submission_data["difficulty"],
-        selected_answer=submission_data["selected_answer"],
-        correct_answer=submission_data["correct_answer"],
-        is_correct=submission_data["is_correct"],
-        time_spent_seconds=submission_data["time_spent_seconds"],
-        timestamp=submission_data.get("timestamp", time.time()),
-        session_id=submission_data["session_id"],
-        teacher_id=teacher_id
-    )
+        # Create submission object
+        submission = QuestionSubmission.from_payload(submission_data, class_id, teacher_id)
     
-    # Record and analyze submission
-    try:
-        analytics.record_question_submission(submission)
+        # Record and analyze submission
+        try:
+            analytics.record_question_submission(submission)
         
-        return {
-            "status": "success",
-            "message": "Submission recorded and analyzed",
-            "submission_id": submission.submission_id,
-            "instant_analysis": {
-                "topic_performance": "calculated",
-                "lo_performance": "calculated",
-                "alerts_checked": "completed"
+            return {
+                "status": "success",
+                "message": "Submission recorded and analyzed",
+                "submission_id": submission.submission_id,
+                "instant_analysis": {
+                    "topic_performance": "calculated",
+                    "lo_performance": "calculated",
+                    "alerts_checked": "completed"
+                }
             }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to record submission: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to record submission: {str(e)}")
 
 @router.get("/classes/{class_id}/overview")
 async def get_class_overview(
@@ -111,7 +256,11 @@ async def get_class_overview(
     teacher_id = current_user["user_id"]
     
     try:
-        overview = analytics.get_class_overview(teacher_id, class_id)
+        cache_key = (teacher_id, class_id, analytics._roster_version, analytics._class_versions[class_id])
+        overview = _cached_view(
+            _overview_cache, cache_key,
+            lambda: analytics.get_class_overview(teacher_id, class_id)
+        )
         
         return {
             "status": "success",
@@ -135,7 +284,11 @@ async def get_student_profile(
     teacher_id = current_user["user_id"]
     
     try:
-        profile = analytics.get_student_profile(teacher_id, student_id)
+        cache_key = (teacher_id, student_id, analytics._roster_version, analytics._student_versions[student_id])
+        profile = _cached_view(
+            _profile_cache, cache_key,
+            lambda: analytics.get_student_profile(teacher_id, student_id)
+        )
         
         return {
             "status": "success",
@@ -160,7 +313,14 @@ async def get_lo_deep_analysis(
     teacher_id = current_user["user_id"]
     
     try:
-        analysis = analytics.get_lo_deep_analysis(teacher_id, learning_outcome, subject)
+        cache_key = (
+            teacher_id, learning_outcome, subject,
+            analytics._roster_version, analytics._lo_versions[(subject, learning_outcome)]
+        )
+        analysis = _cached_view(
+            _lo_analysis_cache, cache_key,
+            lambda: analytics.get_lo_deep_analysis(teacher_id, learning_outcome, subject)
+        )
         
         return {
             "status": "success",
@@ -278,7 +438,7 @@ async def generate_mini_test(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Test generation failed: {str(e)}")
 
-@router.get("/alerts")
+@router.get("/alerts", response_model=AlertListResponse)
 async def get_active_alerts(
     class_id: Optional[str] = None,
     severity: Optional[str] = None,
@@ -291,48 +451,30 @@ async def get_active_alerts(
     
     try:
         # Get teacher's accessible students
-        teacher_students = analytics._get_all_teacher_students(teacher_id)
+        teacher_students = set(analytics._get_all_teacher_students(teacher_id))
         
-        # Filter alerts
+        # Alerts come back already ordered by severity and creation time
         active_alerts = [
-            alert for alert in analytics.active_alerts 
-            if alert.is_active and alert.student_id in teacher_students
+            alert for alert in analytics.get_alerts_by_priority(severity or None)
+            if alert.is_active
+            and alert.student_id in teacher_students
+            and (not class_id or alert.class_id == class_id)
         ]
+        severity_counts = Counter(alert.severity for alert in active_alerts)
         
-        # Apply filters
-        if class_id:
-            active_alerts = [alert for alert in active_alerts if alert.class_id == class_id]
-        
-        if severity:
-            active_alerts = [alert for alert in active_alerts if alert.severity == severity]
-        
-        # Sort by severity and creation time
-        severity_order = {"critical": 4, "high": 3, "medium": 2, "low": 1}
-        active_alerts.sort(
-            key=lambda x: (severity_order.get(x.severity, 0), x.created_at), 
-            reverse=True
-        )
+        # Large backlogs are encoded alert by alert instead of as one big list
+        if len(active_alerts) > ALERT_STREAM_THRESHOLD:
+            return StreamingResponse(
+                _stream_alerts(active_alerts, severity_counts),
+                media_type="application/json"
+            )
         
         return {
             "status": "success",
-            "alerts": [
-                {
-                    "alert_id": alert.alert_id,
-                    "alert_type": alert.alert_type,
-                    "student_id": alert.student_id,
-                    "class_id": alert.class_id,
-                    "subject": alert.subject,
-                    "topic": alert.topic,
-                    "learning_outcome": alert.learning_outcome,
-                    "severity": alert.severity,
-                    "message": alert.message,
-                    "created_at": alert.created_at,
-                    "recommended_actions": alert.recommended_actions
-                } for alert in active_alerts
-            ],
+            "alerts": [_alert_payload(alert) for alert in active_alerts],
             "total_count": len(active_alerts),
-            "critical_count": len([a for a in active_alerts if a.severity == "critical"]),
-            "high_count": len([a for a in active_alerts if a.severity == "high"])
+            "critical_count": severity_counts["critical"],
+            "high_count": severity_counts["high"]
         }
     
     except Exception as e:
@@ -360,7 +502,7 @@ async def resolve_alert(
         raise HTTPException(status_code=403, detail="Access denied to this alert")
     
     try:
-        alert.is_active = False
+        analytics.resolve_alert(alert)
         
         return {
             "status": "success",
@@ -395,17 +537,12 @@ async def get_class_performance_trends(
         cutoff_time = time.time() - (days * 24 * 60 * 60)
         student_ids = analytics.class_rosters[teacher_id][class_id]
         
-        submissions = [
-            s for s in analytics.submissions 
-            if s.student_id in student_ids 
-            and s.class_id == class_id 
-            and s.timestamp >= cutoff_time
-        ]
-        
-        if subject:
-            submissions = [s for s in submissions if s.subject == subject]
+        # The scan and aggregation are CPU-bound; keep them off the event loop
+        trends = await asyncio.to_thread(
+            _compute_class_trends, analytics, class_id, student_ids, cutoff_time, subject
+        )
         
-        if not submissions:
+        if trends is None:
             return {
                 "status": "success",
                 "data": {
@@ -415,19 +552,7 @@ async def get_class_performance_trends(
                 }
             }
         
-        # Calculate daily trends
-        daily_trends = analytics._calculate_class_7day_trend(submissions)
-        
-        # Calculate subject breakdown
-        subject_performance = {}
-        for subj in set(s.subject for s in submissions):
-            subj_submissions = [s for s in submissions if s.subject == subj]
-            accuracy = sum(s.is_correct for s in subj_submissions) / len(subj_submissions)
-            subject_performance[subj] = {
-                "accuracy": accuracy,
-                "total_questions": len(subj_submissions),
-                "improvement_areas": analytics._calculate_topic_struggles(subj_submissions)[:3]
-            }
+        total_submissions, daily_trends, subject_performance = trends
         
         return {
             "status": "success",
@@ -435,7 +560,7 @@ async def get_class_performance_trends(
                 "period_days": days,
                 "class_id": class_id,
                 "subject_filter": subject,
-                "total_submissions": len(submissions),
+                "total_submissions": total_submissions,
                 "overall_trends": daily_trends,
                 "subject_performance": subject_performance,
                 "generated_at": time.time()
@@ -614,59 +739,10 @@ async def populate_sample_data(
         
         analytics.video_library.extend(sample_videos)
         
-        # Generate sample submissions with various performance patterns
-        import random
-        
-        sample_submissions = []
-        current_time = time.time()
-        
-        topics = [
-            ("Matematik", "Rasyonel Sayılar", "Rasyonel sayıları tanır"),
-            ("Matematik", "Cebirsel İfadeler", "Cebirsel ifadeleri sadeleştirir"),
-            ("Fen Bilimleri", "Hücre Bölünmesi", "Mitoz bölünme evrelerini sıralar"),
-            ("Fen Bilimleri", "Kalıtım", "Kalıtım kanunlarını açıklar")
-        ]
-        
         students = ["student_001", "student_002", "student_003", "student_004", "student_005", "student_006"]
         
-        for i in range(200):  # Generate 200 sample submissions
-            student_id = random.choice(students)
-            subject, topic, lo = random.choice(topics)
-            class_id = "class_8A" if student_id in ["student_001", "student_002", "student_003"] else "class_8B"
-            
-            # Create performance patterns for different students
-            if student_id == "student_001":  # High performer
-                is_correct = random.random() < 0.85
-            elif student_id == "student_002":  # Struggling in math
-                is_correct = random.random() < 0.4 if subject == "Matematik" else random.random() < 0.75
-            elif student_id == "student_003":  # Declining performance
-                is_correct = random.random() < max(0.3, 0.8 - (i / 200) * 0.5)
-            else:  # Average performers
-                is_correct = random.random() < 0.65
-            
-            submission = QuestionSubmission(
-                submission_id=f"sub_{i:03d}_{student_id}",
-                student_id=student_id,
-                question_id=f"q_{random.randint(1000, 9999)}",
-                class_id=class_id,
-                subject=subject,
-                topic=topic,
-                learning_outcome=lo,
-                difficulty=random.choice(["KOLAY", "ORTA", "ZOR"]),
-                selected_answer=random.choice(["A", "B", "C", "D"]),
-                correct_answer=random.choice(["A", "B", "C", "D"]),
-                is_correct=is_correct,
-                time_spent_seconds=random.randint(30, 300),
-                timestamp=current_time - random.randint(0, 14 * 24 * 60 * 60),  # Last 14 days
-                session_id=f"session_{random.randint(100, 999)}",
-                teacher_id=teacher_id
-            )
-            
-            sample_submissions.append(submission)
-        
-        # Process all submissions
-        for submission in sample_submissions:
-            analytics.record_question_submission(submission)
+        # Recording mutates the shared, unlocked analytics engine, so it stays on the event loop
+        sample_submissions = _populate_sample_submissions(analytics, teacher_id, students)
         
         return {
             "status": "success",
@@ -7,12 +7,15 @@ Implements intelligent caching with cache key strategies and pre-generation pool
 import json
 import hashlib
 import time
-import pickle
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
 import asyncio
 from datetime import datetime, timedelta
 import logging
+import threading
+import zlib
+import bisect
+from collections import OrderedDict, defaultdict, deque
 
 try:
     import redis
@@ -22,6 +25,104 @@ except ImportError:
     REDIS_AVAILABLE = False
     print("⚠️ Redis not available - using in-memory cache fallback")
 
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+def _dumps(value: Any) -> bytes:
+    """Serialize a cache payload to UTF-8 JSON (strings are stored as-is)"""
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value).encode('utf-8')
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """Deserialize JSON produced by _dumps"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Payloads at least this large are compressed before they are stored
+COMPRESS_MIN_BYTES = 512
+_CODEC_RAW, _CODEC_ZSTD, _CODEC_ZLIB = b'\x00', b'\x01', b'\x02'
+_codec_contexts = threading.local()  # zstd contexts are not thread-safe
+
+
+def _pack(raw: bytes) -> bytes:
+    """Prefix a serialized payload with its codec tag, compressing large ones"""
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return _CODEC_RAW + raw
+    if ZSTD_AVAILABLE:
+        if not hasattr(_codec_contexts, 'compressor'):
+            _codec_contexts.compressor = zstandard.ZstdCompressor(level=3)
+        return _CODEC_ZSTD + _codec_contexts.compressor.compress(raw)
+    return _CODEC_ZLIB + zlib.compress(raw, 6)
+
+
+def _unpack(blob: bytes) -> bytes:
+    """Strip the codec tag and decompress if needed"""
+    codec, body = blob[:1], blob[1:]
+    if codec == _CODEC_ZSTD:
+        if not hasattr(_codec_contexts, 'decompressor'):
+            _codec_contexts.decompressor = zstandard.ZstdDecompressor()
+        return _codec_contexts.decompressor.decompress(body)
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(body)
+    return body
+
+
+def _decode(blob: bytes) -> Any:
+    """Turn a stored blob back into the cached value"""
+    raw = _unpack(blob)
+    try:
+        return _loads(raw)
+    except json.JSONDecodeError:  # orjson's decode error subclasses this
+        return raw.decode('utf-8')
+
+
+# Payloads over this size, or write batches of this many entries, are (de)serialized in a worker thread
+SERIALIZE_OFFLOAD_BYTES = 4096
+SERIALIZE_OFFLOAD_BATCH = 16
+
+
+async def _decode_async(blob: bytes) -> Any:
+    """Decode, moving large payloads off the event loop"""
+    if len(blob) > SERIALIZE_OFFLOAD_BYTES:
+        return await asyncio.to_thread(_decode, blob)
+    return _decode(blob)
+
+
+def _hash_int(data: str) -> int:
+    """Non-cryptographic 64-bit hash for the shard ring"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_intdigest(data.encode('utf-8'))
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _hash_key(key_data: str) -> str:
+    """Non-cryptographic 128-bit hex digest for cache key namespacing"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_hexdigest(key_data.encode('utf-8'))
+    return hashlib.blake2b(key_data.encode('utf-8'), digest_size=16).hexdigest()
+
 @dataclass
 class CacheConfig:
     """Redis cache configuration"""
@@ -31,6 +132,9 @@ class CacheConfig:
     password: Optional[str] = None
     default_ttl: int = 3600  # 1 hour
     max_memory_cache_size: int = 1000
+    access_flush_interval: float = 5.0  # Seconds between access-count flushes
+    shard_hosts: List[Tuple[str, int]] = field(default_factory=list)  # Extra (host, port) shards
+    shard_virtual_nodes: int = 160  # Hash ring points per shard
 
 @dataclass
 class CacheEntry:
@@ -41,52 +145,80 @@ class CacheEntry:
     quality_score: float
     cache_key: str
 
+@dataclass
+class PoolState:
+    """Pre-generation pool with a running confidence total for O(1) stats"""
+    questions: deque
+    sum_confidence: float = 0.0
+    
+    def push(self, question: Dict):
+        """Append a question, dropping the oldest one when the pool is full"""
+        if len(self.questions) == self.questions.maxlen:
+            self.sum_confidence -= self.questions.popleft().get('confidence', 0)
+        self.questions.append(question)
+        self.sum_confidence += question.get('confidence', 0)
+    
+    def pop(self) -> Dict:
+        """Remove and return the oldest question"""
+        question = self.questions.popleft()
+        self.sum_confidence = self.sum_confidence - question.get('confidence', 0) if self.questions else 0.0
+        return question
+    
+    @property
+    def avg_confidence(self) -> float:
+        """Mean confidence of the pooled questions"""
+        return self.sum_confidence / len(self.questions) if self.questions else 0
+
 class InMemoryCache:
     """Fallback in-memory cache when Redis is unavailable"""
     
     def __init__(self, max_size: int = 1000):
-        self.cache: Dict[str, CacheEntry] = {}
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()  # Oldest access first
         self.max_size = max_size
-        self.access_log: Dict[str, float] = {}
     
     async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
         """Set cache entry"""
         try:
             # Serialize the value
-            serialized_value = json.dumps(value) if not isinstance(value, str) else value
+            serialized_value = _dumps(value)
             
             # Check if we need to evict entries
-            if len(self.cache) >= self.max_size:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif len(self.cache) >= self.max_size:
                 await self._evict_lru()
             
             self.cache[key] = CacheEntry(
                 data=value,
-                created_at=time.time(),
+                created_at=time.monotonic(),  # Process-local, only used for TTL
                 access_count=0,
                 quality_score=0.5,
                 cache_key=key
             )
-            self.access_log[key] = time.time()
             return True
         except Exception as e:
             logging.error(f"Cache set error: {e}")
             return False
     
+    async def bulk_set(self, items: List[Tuple[str, Any, Optional[int]]]) -> List[bool]:
+        """Set many (key, value, ttl) entries"""
+        return [await self.set(key, value, ttl or 3600) for key, value, ttl in items]
+    
     async def get(self, key: str) -> Optional[Any]:
         """Get cache entry"""
         try:
             entry = self.cache.get(key)
-            if entry:
-                # Check TTL (simple expiration)
-                if time.time() - entry.created_at < 3600:  # 1 hour default
-                    entry.access_count += 1
-                    self.access_log[key] = time.time()
-                    return entry.data
-                else:
-                    # Expired
-                    del self.cache[key]
-                    if key in self.access_log:
-                        del self.access_log[key]
+            if entry is None:
+                return None
+            
+            # Check TTL (simple expiration)
+            if time.monotonic() - entry.created_at < 3600:  # 1 hour default
+                entry.access_count += 1
+                self.cache.move_to_end(key)
+                return entry.data
+            
+            # Expired
+            self.cache.pop(key, None)
             return None
         except Exception:
             return None
@@ -97,26 +229,13 @@ class InMemoryCache:
     
     async def delete(self, key: str) -> bool:
         """Delete cache entry"""
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.access_log:
-            del self.access_log[key]
+        self.cache.pop(key, None)
         return True
     
     async def _evict_lru(self):
-        """Evict least recently used entries"""
-        if not self.access_log:
-            return
-        
-        # Remove 10% of entries (LRU)
-        evict_count = max(1, len(self.cache) // 10)
-        sorted_keys = sorted(self.access_log.items(), key=lambda x: x[1])
-        
-        for key, _ in sorted_keys[:evict_count]:
-            if key in self.cache:
-                del self.cache[key]
-            if key in self.access_log:
-                del self.access_log[key]
+        """Evict least recently used entries until there is room for one more"""
+        while self.cache and len(self.cache) >= self.max_size:
+            self.cache.popitem(last=False)
     
     async def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -131,89 +250,184 @@ class InMemoryCache:
 class RedisCache:
     """Redis-based cache implementation"""
     
+    # Bump access_count only while the entry exists, so flushes never resurrect expired keys
+    INCR_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HINCRBY', KEYS[1], 'access_count', ARGV[1])
+end
+return 0
+"""
+    
     def __init__(self, config: CacheConfig):
         self.config = config
-        self.redis_client = None
+        self.shards: List[Any] = []
+        self._incr_scripts: List[Any] = []
         self._stats = {
             'hits': 0,
             'misses': 0,
             'sets': 0,
             'errors': 0
         }
+        
+        # Consistent-hash ring: sorted virtual node points and their shard index
+        self._ring: List[int] = []
+        self._ring_shards: List[int] = []
+        
+        # Hit counts are accumulated locally and flushed in batches
+        self._pending_hits: Dict[str, int] = defaultdict(int)
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    @property
+    def redis_client(self):
+        """Primary shard (None when disconnected)"""
+        return self.shards[0] if self.shards else None
     
     async def connect(self) -> bool:
         """Connect to Redis"""
         try:
-            self.redis_client = AsyncRedis(
-                host=self.config.host,
-                port=self.config.port,
-                db=self.config.db,
-                password=self.config.password,
-                decode_responses=True
-            )
+            endpoints = [(self.config.host, self.config.port), *self.config.shard_hosts]
+            shards = [
+                AsyncRedis(
+                    host=host,
+                    port=port,
+                    db=self.config.db,
+                    password=self.config.password,
+                    decode_responses=False  # Payloads are binary (codec tag + body)
+                )
+                for host, port in endpoints
+            ]
             
-            # Test connection
-            await self.redis_client.ping()
+            # Test connections
+            await asyncio.gather(*(shard.ping() for shard in shards))
+            self.shards = shards
+            self._incr_scripts = [shard.register_script(self.INCR_IF_EXISTS_SCRIPT) for shard in shards]
+            self._build_ring(endpoints)
             return True
         except Exception as e:
             logging.error(f"Redis connection failed: {e}")
             return False
     
+    def _build_ring(self, endpoints: List[Tuple[str, int]]):
+        """Place virtual nodes for every shard on the hash ring"""
+        points = sorted(
+            (_hash_int(f"{host}:{port}#{vnode}"), index)
+            for index, (host, port) in enumerate(endpoints)
+            for vnode in range(self.config.shard_virtual_nodes)
+        )
+        self._ring = [point for point, _ in points]
+        self._ring_shards = [index for _, index in points]
+    
+    def _shard_index(self, key: str) -> int:
+        """Index of the shard owning a key"""
+        if len(self.shards) == 1:
+            return 0
+        position = bisect.bisect(self._ring, _hash_int(key)) % len(self._ring)
+        return self._ring_shards[position]
+    
+    def _shard_for(self, key: str):
+        """Redis client owning a key"""
+        return self.shards[self._shard_index(key)]
+    
+    def _group_by_shard(self, keys) -> Dict[int, List[int]]:
+        """Group key positions by owning shard index"""
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[self._shard_index(key)].append(position)
+        return groups
+    
     async def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Set cache entry with optional TTL"""
         try:
-            if not self.redis_client:
+            if not self.shards:
                 return False
             
             ttl = ttl or self.config.default_ttl
-            serialized_value = json.dumps(value) if not isinstance(value, str) else value
             
-            # Set with expiration
-            result = await self.redis_client.setex(key, ttl, serialized_value)
-            
-            # Store metadata
-            metadata_key = f"{key}:meta"
-            metadata = {
-                'created_at': time.time(),
-                'access_count': 0,
-                'quality_score': value.get('confidence', 0.5) if isinstance(value, dict) else 0.5
-            }
-            await self.redis_client.setex(metadata_key, ttl, json.dumps(metadata))
+            # HSET and EXPIRE travel in a single round trip
+            async with self._shard_for(key).pipeline(transaction=False) as pipe:
+                self._queue_set(pipe, key, value, ttl)
+                results = await pipe.execute()
             
             self._stats['sets'] += 1
-            return result
+            return bool(results[1])
         except Exception as e:
             self._stats['errors'] += 1
             logging.error(f"Redis set error: {e}")
             return False
     
+    async def bulk_set(self, items: List[Tuple[str, Any, Optional[int]]]) -> List[bool]:
+        """Set many (key, value, ttl) entries with one pipelined round trip per shard"""
+        try:
+            if not self.shards:
+                return [False] * len(items)
+            
+            # Serializing a large batch would stall the event loop
+            if len(items) >= SERIALIZE_OFFLOAD_BATCH:
+                encoded = await asyncio.to_thread(lambda: [self._encode_entry(value) for _, value, _ in items])
+            else:
+                encoded = [self._encode_entry(value) for _, value, _ in items]
+            
+            async def write_shard(index: int, positions: List[int]) -> List[Any]:
+                async with self.shards[index].pipeline(transaction=False) as pipe:
+                    for position in positions:
+                        key, _, ttl = items[position]
+                        self._queue_encoded(pipe, key, encoded[position], ttl or self.config.default_ttl)
+                    return await pipe.execute()
+            
+            groups = self._group_by_shard(key for key, _, _ in items)
+            replies = await asyncio.gather(*(write_shard(index, positions) for index, positions in groups.items()))
+            
+            stored = [False] * len(items)
+            for positions, results in zip(groups.values(), replies):
+                for position, result in zip(positions, results[1::2]):  # EXPIRE replies
+                    stored[position] = bool(result)
+            
+            self._stats['sets'] += len(items)
+            return stored
+        except Exception as e:
+            self._stats['errors'] += 1
+            logging.error(f"Redis bulk set error: {e}")
+            return [False] * len(items)
+    
+    def _queue_set(self, pipe, key: str, value: Any, ttl: int):
+        """Queue the hash write and expiry for one entry on a pipeline"""
+        self._queue_encoded(pipe, key, self._encode_entry(value), ttl)
+    
+    @staticmethod
+    def _encode_entry(value: Any) -> Dict[str, Any]:
+        """Serialize a value into the fields of its entry hash"""
+        return {
+            'data': _pack(_dumps(value)),
+            'created_at': time.time(),
+            'quality_score': value.get('confidence', 0.5) if isinstance(value, dict) else 0.5,
+            'access_count': 0
+        }
+    
+    @staticmethod
+    def _queue_encoded(pipe, key: str, entry: Dict[str, Any], ttl: int):
+        """Queue writes for an already serialized entry"""
+        pipe.hset(key, mapping=entry)
+        pipe.expire(key, ttl)
+    
     async def get(self, key: str) -> Optional[Any]:
         """Get cache entry"""
         try:
-            if not self.redis_client:
+            if not self.shards:
                 return None
             
-            # Get value
-            value = await self.redis_client.get(key)
+            value = await self._shard_for(key).hget(key, 'data')
+            
             if value is None:
                 self._stats['misses'] += 1
                 return None
             
-            # Update access count
-            metadata_key = f"{key}:meta"
-            metadata_str = await self.redis_client.get(metadata_key)
-            if metadata_str:
-                metadata = json.loads(metadata_str)
-                metadata['access_count'] += 1
-                await self.redis_client.setex(metadata_key, self.config.default_ttl, json.dumps(metadata))
+            # Count the hit locally; the flush task writes it out later
+            self._pending_hits[key] += 1
+            self._ensure_flush_task()
             
             self._stats['hits'] += 1
             
-            # Try to parse as JSON
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value
+            return await _decode_async(value)
                 
         except Exception as e:
             self._stats['errors'] += 1
@@ -223,38 +437,83 @@ class RedisCache:
     async def exists(self, key: str) -> bool:
         """Check if key exists"""
         try:
-            if not self.redis_client:
+            if not self.shards:
                 return False
-            return await self.redis_client.exists(key) > 0
+            return await self._shard_for(key).exists(key) > 0
         except Exception:
             return False
     
     async def delete(self, key: str) -> bool:
         """Delete cache entry"""
         try:
-            if not self.redis_client:
+            if not self.shards:
                 return False
             
-            result = await self.redis_client.delete(key)
-            await self.redis_client.delete(f"{key}:meta")  # Delete metadata too
-            return result > 0
+            self._pending_hits.pop(key, None)
+            return await self._shard_for(key).delete(key) > 0
         except Exception:
             return False
     
+    def _ensure_flush_task(self):
+        """Start the background access-count flusher if it is not running"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        """Periodically write accumulated hit counts to Redis"""
+        while True:
+            await asyncio.sleep(self.config.access_flush_interval)
+            await self.flush_access_counts()
+    
+    async def flush_access_counts(self) -> int:
+        """Add pending hit counts to each entry's access_count in one pipeline per shard"""
+        if not self._pending_hits or not self.shards:
+            return 0
+        
+        pending, self._pending_hits = self._pending_hits, defaultdict(int)
+        keys = list(pending)
+        
+        async def flush_shard(index: int, positions: List[int]):
+            async with self.shards[index].pipeline(transaction=False) as pipe:
+                for position in positions:
+                    key = keys[position]
+                    await self._incr_scripts[index](keys=[key], args=[pending[key]], client=pipe)
+                await pipe.execute()
+        
+        try:
+            groups = self._group_by_shard(keys)
+            await asyncio.gather(*(flush_shard(index, positions) for index, positions in groups.items()))
+            return len(pending)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logging.error(f"Redis access count flush error: {e}")
+            return 0
+    
+    async def close(self):
+        """Flush pending hit counts and close the Redis connection"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush_access_counts()
+        for shard in self.shards:
+            await shard.close()
+        self.shards = []
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get Redis statistics"""
         try:
-            if not self.redis_client:
+            if not self.shards:
                 return {'cache_type': 'redis', 'status': 'disconnected'}
             
-            info = await self.redis_client.info()
+            infos = await asyncio.gather(*(shard.info() for shard in self.shards))
             hit_rate = self._stats['hits'] / (self._stats['hits'] + self._stats['misses']) * 100 if (self._stats['hits'] + self._stats['misses']) > 0 else 0
             
             return {
                 'cache_type': 'redis',
                 'status': 'connected',
-                'total_keys': info.get('db0', {}).get('keys', 0),
-                'memory_usage': info.get('used_memory_human', 'Unknown'),
+                'shards': len(self.shards),
+                'total_keys': sum(info.get(f'db{self.config.db}', {}).get('keys', 0) for info in infos),
+                'memory_usage': ', '.join(info.get('used_memory_human', 'Unknown') for info in infos),
                 'hits': self._stats['hits'],
                 'misses': self._stats['misses'],
                 'hit_rate': hit_rate,
@@ -267,18 +526,38 @@ class RedisCache:
 class QuestionCacheManager:
     """High-level cache manager for question generation"""
     
+    WRITE_BATCH_SIZE = 64  # Max queued writes sent per pipeline
+    CLEAR_BATCH_SIZE = 500  # Keys scanned and deleted per step in clear_cache
+    HIGH_FREQUENCY_SUBJECTS = ('Türkçe', 'Matematik')
+    DIFFICULTY_LEVELS = ('KOLAY', 'ORTA', 'ZOR')
+    
     def __init__(self, config: Optional[CacheConfig] = None):
         self.config = config or CacheConfig()
         self.cache: Union[RedisCache, InMemoryCache] = None
         self.is_redis = False
         
+        # Fire-and-forget question writes (Redis only)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        
+        # Generations in progress, keyed by cache key (singleflight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
         # Pre-generation pools
-        self.pregeneration_pools: Dict[str, List[Dict]] = {}
+        self.pregeneration_pools: Dict[str, PoolState] = {}
+        self.max_pool_size = 50
         self.pool_refill_thresholds = {
             'high_frequency': 10,  # Refill when < 10 questions left
             'medium_frequency': 5,
             'low_frequency': 2
         }
+        
+        # Frequency category per (subject, difficulty), precomputed from the heuristic below
+        self._frequency_table: Dict[Tuple[str, str], str] = {
+            (subject, difficulty): 'high_frequency' if difficulty == 'ORTA' else 'medium_frequency'
+            for subject in self.HIGH_FREQUENCY_SUBJECTS
+            for difficulty in self.DIFFICULTY_LEVELS
+        }
     
     async def initialize(self) -> bool:
         """Initialize cache backend"""
@@ -299,8 +578,7 @@ class QuestionCacheManager:
     def generate_cache_key(self, subject: str, topic: str, learning_outcome: str, difficulty: str) -> str:
         """Generate cache key for question parameters"""
         key_data = f"{subject}:{topic}:{learning_outcome}:{difficulty}"
-        key_hash = hashlib.md5(key_data.encode('utf-8')).hexdigest()
-        return f"question:{key_hash}"
+        return f"question:{_hash_key(key_data)}"
     
     def generate_pool_key(self, subject: str, difficulty: str) -> str:
         """Generate key for pre-generation pools"""
@@ -328,17 +606,83 @@ class QuestionCacheManager:
             'cache_key': cache_key
         }
         
-        return await self.cache.set(cache_key, cached_question, ttl)
+        if not self.is_redis:
+            return await self.cache.set(cache_key, cached_question, ttl)
+        
+        # Queue the write; the writer task pipelines it with others
+        self._ensure_writer()
+        await self._write_queue.put((cache_key, cached_question, ttl))
+        return True
+    
+    async def generate_once(self, subject: str, topic: str, learning_outcome: str, difficulty: str,
+                            generate: Callable[[], Awaitable[Dict]], ttl: int = None) -> Dict:
+        """Generate and cache a question, sharing one in-flight generation among concurrent callers"""
+        cache_key = self.generate_cache_key(subject, topic, learning_outcome, difficulty)
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            # The generation runs in its own task, so it outlives any one caller
+            task = asyncio.ensure_future(
+                self._generate_and_cache(generate, subject, topic, learning_outcome, difficulty, ttl)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish_generation(cache_key, done))
+        
+        # Shield so a cancelled caller neither aborts nor poisons the shared generation
+        return await asyncio.shield(task)
+    
+    async def _generate_and_cache(self, generate: Callable[[], Awaitable[Dict]], subject: str, topic: str,
+                                  learning_outcome: str, difficulty: str, ttl: Optional[int]) -> Dict:
+        """Run one generation and cache its question unless it failed"""
+        question = await generate()
+        if 'error' not in question:
+            await self.cache_question(question, subject, topic, learning_outcome, difficulty, ttl)
+        return question
+    
+    def _finish_generation(self, cache_key: str, task: asyncio.Task):
+        """Forget a finished generation so the next caller starts afresh"""
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when every caller was cancelled
+    
+    def _ensure_writer(self):
+        """Start the background cache writer if it is not running"""
+        if self._write_queue is None:
+            self._write_queue = asyncio.Queue()
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._drain_writes())
+    
+    async def _drain_writes(self):
+        """Write queued questions in pipelined batches"""
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            
+            try:
+                await self.cache.bulk_set(batch)
+            except Exception as e:
+                logging.error(f"Cache write batch error: {e}")
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    async def flush_writes(self):
+        """Wait until all queued question writes have been sent"""
+        if self._write_queue is not None:
+            await self._write_queue.join()
     
     async def get_from_pool(self, subject: str, difficulty: str) -> Optional[Dict]:
         """Get question from pre-generation pool"""
         pool_key = self.generate_pool_key(subject, difficulty)
         
-        if pool_key in self.pregeneration_pools and self.pregeneration_pools[pool_key]:
-            question = self.pregeneration_pools[pool_key].pop(0)
+        pool = self.pregeneration_pools.get(pool_key)
+        if pool and pool.questions:
+            question = pool.pop()
             
             # Check if pool needs refilling
-            remaining = len(self.pregeneration_pools[pool_key])
+            remaining = len(pool.questions)
             frequency = self._determine_frequency(subject, difficulty)
             threshold = self.pool_refill_thresholds.get(frequency, 5)
             
@@ -354,29 +698,24 @@ class QuestionCacheManager:
         """Add questions to pre-generation pool"""
         pool_key = self.generate_pool_key(subject, difficulty)
         
-        if pool_key not in self.pregeneration_pools:
-            self.pregeneration_pools[pool_key] = []
-        
-        self.pregeneration_pools[pool_key].extend(questions)
+        pool = self.pregeneration_pools.get(pool_key)
+        if pool is None:
+            # Bounded deque drops the oldest questions once full (keeps most recent)
+            pool = self.pregeneration_pools[pool_key] = PoolState(deque(maxlen=self.max_pool_size))
         
-        # Limit pool size (keep most recent)
-        max_pool_size = 50
-        if len(self.pregeneration_pools[pool_key]) > max_pool_size:
-            self.pregeneration_pools[pool_key] = self.pregeneration_pools[pool_key][-max_pool_size:]
+        for question in questions:
+            pool.push(question)
         
         return True
     
     def _determine_frequency(self, subject: str, difficulty: str) -> str:
         """Determine frequency category for subject/difficulty combination"""
-        # Simple heuristic - in production, this would use actual usage statistics
-        high_frequency_subjects = ['Türkçe', 'Matematik']
-        
-        if subject in high_frequency_subjects and difficulty == 'ORTA':
-            return 'high_frequency'
-        elif subject in high_frequency_subjects:
-            return 'medium_frequency'
-        else:
-            return 'low_frequency'
+        # Simple heuristic - in production, this would use actual usage statistics:
+        # ORTA questions in high-frequency subjects are high, their other levels medium, the rest low
+        frequency = self._frequency_table.get((subject, difficulty))
+        if frequency is not None:
+            return frequency
+        return 'medium_frequency' if subject in self.HIGH_FREQUENCY_SUBJECTS else 'low_frequency'
     
     async def _schedule_pool_refill(self, subject: str, difficulty: str):
         """Schedule background pool refill (placeholder for production implementation)"""
@@ -392,16 +731,16 @@ class QuestionCacheManager:
         
         # Add pool statistics
         pool_stats = {}
-        for pool_key, questions in self.pregeneration_pools.items():
+        for pool_key, pool in self.pregeneration_pools.items():
             pool_stats[pool_key] = {
-                'size': len(questions),
-                'avg_confidence': sum(q.get('confidence', 0) for q in questions) / len(questions) if questions else 0
+                'size': len(pool.questions),
+                'avg_confidence': pool.avg_confidence
             }
         
         return {
             'cache_backend': cache_stats,
             'pregeneration_pools': pool_stats,
-            'total_pooled_questions': sum(len(questions) for questions in self.pregeneration_pools.values())
+            'total_pooled_questions': sum(len(pool.questions) for pool in self.pregeneration_pools.values())
         }
     
     async def clear_cache(self, pattern: Optional[str] = None) -> bool:
@@ -411,11 +750,16 @@ class QuestionCacheManager:
         
         if self.is_redis and pattern:
             try:
-                # Redis-specific pattern clearing
-                redis_client = self.cache.redis_client
-                keys = await redis_client.keys(pattern)
-                if keys:
-                    await redis_client.delete(*keys)
+                # Redis-specific pattern clearing on every shard; SCAN avoids blocking like KEYS
+                for redis_client in self.cache.shards:
+                    batch = []
+                    async for key in redis_client.scan_iter(match=pattern, count=self.CLEAR_BATCH_SIZE):
+                        batch.append(key)
+                        if len(batch) >= self.CLEAR_BATCH_SIZE:
+                            await redis_client.delete(*batch)
+                            batch.clear()
+                    if batch:
+                        await redis_client.delete(*batch)
                 return True
             except Exception as e:
                 logging.error(f"Cache clear error: {e}")
@@ -424,12 +768,13 @@ class QuestionCacheManager:
             # Clear entire cache for in-memory implementation
             if hasattr(self.cache, 'cache'):
                 self.cache.cache.clear()
-                self.cache.access_log.clear()
             return True
     
     async def warm_up_cache(self, common_combinations: List[Dict]) -> Dict[str, int]:
         """Pre-warm cache with common question combinations"""
         results = {'success': 0, 'failed': 0}
+        entries = []
+        cached_at = time.time()
         
         for combo in common_combinations:
             try:
@@ -447,19 +792,22 @@ class QuestionCacheManager:
                     'stem': f"Placeholder question for {combo['subject']} - {combo['difficulty']}",
                     'subject': combo['subject'],
                     'difficulty_level': combo['difficulty'],
-                    'cached_at': time.time(),
+                    'cached_at': cached_at,
                     'is_placeholder': True
                 }
                 
-                if await self.cache.set(cache_key, placeholder_question):
-                    results['success'] += 1
-                else:
-                    results['failed'] += 1
+                entries.append((cache_key, placeholder_question, None))
                     
             except Exception as e:
                 logging.error(f"Cache warm-up error for {combo}: {e}")
                 results['failed'] += 1
         
+        # Write all warm-up entries as one batch
+        if entries:
+            stored = await self.cache.bulk_set(entries)
+            results['success'] += sum(stored)
+            results['failed'] += len(stored) - sum(stored)
+        
         return results
 
 # Global cache manager instance
@@ -475,6 +823,15 @@ async def get_cache_manager() -> QuestionCacheManager:
     
     return cache_manager
 
+async def close_cache_manager():
+    """Send queued question writes and pending hit counts before shutdown"""
+    if cache_manager is None:
+        return
+    
+    await cache_manager.flush_writes()
+    if cache_manager.is_redis:
+        await cache_manager.cache.close()
+
 async def warm_up_common_questions():
     """Warm up cache with most common question types"""
     manager = await get_cache_manager()
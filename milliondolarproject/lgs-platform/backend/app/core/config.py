@@ -1,8 +1,13 @@
-from pydantic_settings import BaseSettings
+from functools import cached_property
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyUrl
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
     PROJECT_NAME: str = "LGS Adaptive Platform"
     API_V1_STR: str = "/api/v1"
 
@@ -12,7 +17,7 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "lgs_pass"
     POSTGRES_DB: str = "lgs_db"
 
-    @property
+    @cached_property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return (
             f"postgresql+psycopg2://{self.POSTGRES_USER}:"
@@ -24,8 +29,8 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
 
-    class Config:
-        env_file = ".env"
+    # Append-only JSONL receiving raw answers evicted from memory; unset keeps every answer in memory
+    ANSWER_SPILL_PATH: Optional[str] = None
 
 
 settings = Settings()
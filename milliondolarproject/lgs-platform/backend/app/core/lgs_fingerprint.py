@@ -6,13 +6,107 @@ Analyzes authentic LGS questions to create statistical fingerprints for validati
 
 import json
 import re
-import statistics
-from typing import Dict, List, Any, Tuple
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Any, Sequence, Tuple
+from dataclasses import dataclass, field
 from collections import Counter, defaultdict
 import pickle
 from pathlib import Path
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from itertools import accumulate, chain
+from bisect import bisect_right
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Precompiled patterns shared by the analyzers
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENT_RE = re.compile(r'[.!?]+')
+_DIGIT_RE = re.compile(r'\d')
+_NUM_RE = re.compile(r'\d+')
+_FRAC_RE = re.compile(r'\d+/\d+')
+_EQ_RE = re.compile(r'[=+\-×÷]')
+_QSTART_RE = re.compile(r'^(Ne|Nasıl|Hangi|Kim|Nerede|Neden)')
+_COND_RE = re.compile(r'\b(eğer|ise|olsaydı|durumunda)\b')
+_COMP_RE = re.compile(r'\b(daha|en|göre|karşı|benzer)\b')
+_ENUM_RE = re.compile(r'\b(birinci|ikinci|üçüncü|I\.|II\.|III\.)\b')
+_PUNCT_RE = re.compile(r'[?!,():;"\u201c\u201d—-]')
+
+# Subject-specific technical term patterns, one combined pattern per subject
+_TECH_RES = {
+    'Matematik': re.compile(r'\b(fonksiyon|denklem|köklü|üslü|logaritma|integral)\b'),
+    'Türkçe': re.compile(r'\b(metafor|benzetme|kişileştirme|anlam|sözcük)\b'),
+    'Fen Bilimleri': re.compile(r'\b(molekül|atom|enerji|kuvvet|hız)\b'),
+    'Sosyal Bilgiler': re.compile(r'\b(tarih|coğrafya|nüfus|iklim|kültür)\b')
+}
+
+
+# Result keys for the top-10 vocabulary entries, built once
+_TOP_KEYS = [(f'top_{i}_word', f'top_{i}_freq') for i in range(1, 11)]
+
+# Float-based summaries; the statistics module computes these with exact fractions, which is far slower
+def _mean(values: List[float]) -> float:
+    """Arithmetic mean of a non-empty sequence"""
+    return math.fsum(values) / len(values)
+
+
+def _variance(values: List[float]) -> float:
+    """Sample variance (n - 1 denominator) of at least two values"""
+    mean = _mean(values)
+    return math.fsum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+def _stdev(values: List[float]) -> float:
+    """Sample standard deviation of at least two values"""
+    return math.sqrt(_variance(values))
+
+
+def _int_variance(values: List[int]) -> float:
+    """Sample variance of at least two integers from exact integer moments in one pass"""
+    n = len(values)
+    total = sum(values)
+    squares = sum(x * x for x in values)
+    return (n * squares - total * total) / (n * (n - 1))
+
+
+class _CountingOrder:
+    """Read-only sorted view of integer data, built from a value histogram instead of a full sort"""
+    
+    def __init__(self, values: Iterable[int]):
+        histogram = Counter(values)
+        self.values = sorted(histogram)
+        self.ends = list(accumulate(histogram[value] for value in self.values))
+    
+    def __len__(self) -> int:
+        return self.ends[-1] if self.ends else 0
+    
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        return self.values[bisect_right(self.ends, index)]
+
+
+def _wcount(text: str) -> int:
+    """Whitespace word count, identical to len(text.split()) without building the list"""
+    # Single-spaced printable text (str.isprintable rejects every whitespace but ' ') counts by separators
+    if text and text.isprintable() and '  ' not in text and text[0] != ' ' and text[-1] != ' ':
+        return text.count(' ') + 1
+    return len(text.split())
+
+
+def _iter_questions(path: Path) -> Iterator[Dict]:
+    """Stream questions from a JSONL file, one parsed line at a time"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _json_loads(line)
 
 @dataclass
 class LGSFingerprint:
@@ -27,30 +121,158 @@ class LGSFingerprint:
     vocabulary_frequency: Dict[str, float]
     structural_patterns: Dict[str, float]
 
+@dataclass
+class _StemScan:
+    """Per-corpus accumulators gathered in one pass over the question stems"""
+    total_stems: int = 0
+    word_counts: array = field(default_factory=lambda: array('l'))  # Unboxed ints
+    sentence_counts: array = field(default_factory=lambda: array('l'))
+    punctuation: Counter = field(default_factory=Counter)
+    contains_numbers: int = 0
+    contains_fractions: int = 0
+    contains_percentages: int = 0
+    contains_equations: int = 0
+    numbers: List[int] = field(default_factory=list)
+    word_freq: Counter = field(default_factory=Counter)
+    total_words: int = 0
+    starts_with_question: int = 0
+    contains_conditional: int = 0
+    contains_comparison: int = 0
+    contains_enumeration: int = 0
+    # Per-stem lowercase text and word tokens, shared with the subject and phrase analyzers
+    stems_lower: List[str] = field(default_factory=list)
+    words: List[List[str]] = field(default_factory=list)
+    
+    def merge(self, other: '_StemScan'):
+        """Append the accumulators of a scan over the stems that follow this one"""
+        self.total_stems += other.total_stems
+        self.word_counts.extend(other.word_counts)
+        self.sentence_counts.extend(other.sentence_counts)
+        self.punctuation.update(other.punctuation)
+        self.contains_numbers += other.contains_numbers
+        self.contains_fractions += other.contains_fractions
+        self.contains_percentages += other.contains_percentages
+        self.contains_equations += other.contains_equations
+        self.numbers.extend(other.numbers)
+        self.word_freq.update(other.word_freq)
+        self.total_words += other.total_words
+        self.starts_with_question += other.starts_with_question
+        self.contains_conditional += other.contains_conditional
+        self.contains_comparison += other.contains_comparison
+        self.contains_enumeration += other.contains_enumeration
+        self.stems_lower.extend(other.stems_lower)
+        self.words.extend(other.words)
+
+
+def _scan_chunk(stems: List[str]) -> _StemScan:
+    """Tokenize each stem once and accumulate every stem-level statistic"""
+    
+    scan = _StemScan(total_stems=len(stems))
+    
+    for stem in stems:
+        stem_lower = stem.lower()
+        
+        # Sentence lengths
+        scan.word_counts.append(_wcount(stem))
+        scan.sentence_counts.append(len(_SENT_RE.split(stem)))
+        
+        # Punctuation (only the tracked marks are counted, in one pass)
+        scan.punctuation.update(_PUNCT_RE.findall(stem))
+        
+        # Numbers and mathematical content
+        if _DIGIT_RE.search(stem):
+            scan.contains_numbers += 1
+            scan.numbers.extend(int(num_str) for num_str in _NUM_RE.findall(stem))
+        if _FRAC_RE.search(stem):
+            scan.contains_fractions += 1
+        if '%' in stem:
+            scan.contains_percentages += 1
+        if _EQ_RE.search(stem):
+            scan.contains_equations += 1
+        
+        # Vocabulary
+        words = _WORD_RE.findall(stem_lower)
+        scan.word_freq.update(words)
+        scan.total_words += len(words)
+        scan.stems_lower.append(stem_lower)
+        scan.words.append(words)
+        
+        # Question structure
+        if _QSTART_RE.match(stem):
+            scan.starts_with_question += 1
+        if _COND_RE.search(stem_lower):
+            scan.contains_conditional += 1
+        if _COMP_RE.search(stem_lower):
+            scan.contains_comparison += 1
+        if _ENUM_RE.search(stem):
+            scan.contains_enumeration += 1
+    
+    return scan
+
+
+# Punctuation patterns scored for candidate stems, in fingerprint order
+_CONFORMANCE_PUNCTUATION = ('question_mark_frequency', 'comma_frequency', 'parentheses_frequency', 'quotation_frequency')
+
+
+@dataclass
+class _ConformanceTargets:
+    """Fingerprint values read once per conformance batch"""
+    word_count_mean: float
+    word_count_std: float
+    option_length_variance: float
+    punctuation: List[Tuple[str, float]]
+    subject_stem_lengths: Dict[str, float]
+
+
 class LGSStatisticalFingerprinter:
     """Advanced fingerprinting system for LGS questions"""
     
-    def __init__(self, authentic_questions: List[Dict]):
-        self.authentic_questions = authentic_questions
+    # Below this many stems per worker, process start-up and pickling cost more than the scan
+    PARALLEL_SCAN_MIN_CHUNK = 20000
+    
+    def __init__(self, authentic_questions: Iterable[Dict]):
+        # Analyzers make several passes, so generators are materialized once here
+        self.authentic_questions = authentic_questions if isinstance(authentic_questions, list) else list(authentic_questions)
         self.fingerprint = self._generate_comprehensive_fingerprint()
         
+    @staticmethod
+    def _empty_fingerprint() -> LGSFingerprint:
+        """Fingerprint the analyzers produce for an empty corpus"""
+        return LGSFingerprint(
+            sentence_length_dist={},
+            option_length_variance=0.0,
+            punctuation_patterns={},
+            distractor_patterns={},
+            numeric_distribution={},
+            subject_specific_patterns={},
+            difficulty_indicators={'KOLAY': [], 'ORTA': [], 'ZOR': []},
+            vocabulary_frequency={},
+            structural_patterns={}
+        )
+    
     def _generate_comprehensive_fingerprint(self) -> LGSFingerprint:
         """Generate complete statistical fingerprint from authentic questions"""
         
+        # Nothing to analyze (e.g. load_fingerprint); skip the analyzer passes and status output
+        if not self.authentic_questions:
+            return self._empty_fingerprint()
+        
         print("🔍 Generating LGS Statistical Fingerprint...")
         print(f"📊 Analyzing {len(self.authentic_questions)} authentic questions")
         
         # Extract all stems and options
         stems = []
+        stem_difficulties = []
         all_options = []
-        subject_data = defaultdict(list)
+        subject_data = defaultdict(list)  # subject -> indices into stems
         
         for q in self.authentic_questions:
             stem = q.get('stem', '')
             if stem:
-                stems.append(stem)
                 subject = q.get('subject', 'unknown')
-                subject_data[subject].append(stem)
+                subject_data[subject].append(len(stems))
+                stems.append(stem)
+                stem_difficulties.append(q.get('difficulty_level', 'ORTA'))
             
             options = q.get('options', [])
             for opt in options:
@@ -58,25 +280,43 @@ class LGSStatisticalFingerprinter:
                 if option_text:
                     all_options.append(option_text)
         
+        # Stem-level components share one pass over the stems
+        scan = self._scan_stems(stems)
+        
         # Generate each component of the fingerprint
         return LGSFingerprint(
-            sentence_length_dist=self._analyze_sentence_lengths(stems),
+            sentence_length_dist=self._analyze_sentence_lengths(scan),
             option_length_variance=self._analyze_option_variance(self.authentic_questions),
-            punctuation_patterns=self._analyze_punctuation_patterns(stems),
+            punctuation_patterns=self._analyze_punctuation_patterns(scan),
             distractor_patterns=self._analyze_distractor_patterns(self.authentic_questions),
-            numeric_distribution=self._analyze_numeric_patterns(stems),
-            subject_specific_patterns=self._analyze_subject_patterns(subject_data),
-            difficulty_indicators=self._extract_difficulty_indicators(self.authentic_questions),
-            vocabulary_frequency=self._analyze_vocabulary_frequency(stems),
-            structural_patterns=self._analyze_structural_patterns(stems)
+            numeric_distribution=self._analyze_numeric_patterns(scan),
+            subject_specific_patterns=self._analyze_subject_patterns(subject_data, scan),
+            difficulty_indicators=self._extract_difficulty_indicators(scan, stem_difficulties),
+            vocabulary_frequency=self._analyze_vocabulary_frequency(scan),
+            structural_patterns=self._analyze_structural_patterns(scan)
         )
     
-    def _calculate_percentile(self, data: List[float], percentile: float) -> float:
-        """Calculate percentile without numpy"""
-        if not data:
-            return 0.0
+    def _scan_stems(self, stems: List[str]) -> _StemScan:
+        """Scan the stems in one pass, fanning contiguous chunks out to worker processes for large corpora"""
+        
+        workers = min(os.cpu_count() or 1, len(stems) // self.PARALLEL_SCAN_MIN_CHUNK)
+        if workers < 2:
+            return _scan_chunk(stems)
         
-        sorted_data = sorted(data)
+        size = -(-len(stems) // workers)
+        chunks = [stems[i:i + size] for i in range(0, len(stems), size)]
+        
+        # Merging in chunk order keeps arrays and Counter insertion order identical to a serial scan
+        scan = _StemScan()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for part in executor.map(_scan_chunk, chunks):
+                scan.merge(part)
+        
+        return scan
+    
+    @staticmethod
+    def _percentile_of_sorted(sorted_data: Sequence[float], percentile: float) -> float:
+        """Linearly interpolated percentile of already sorted, non-empty data (a list or _CountingOrder)"""
         n = len(sorted_data)
         index = (percentile / 100.0) * (n - 1)
         
@@ -91,82 +331,68 @@ class LGSStatisticalFingerprinter:
             weight = index - lower_index
             return sorted_data[lower_index] * (1 - weight) + sorted_data[upper_index] * weight
     
-    def _analyze_sentence_lengths(self, stems: List[str]) -> Dict[str, float]:
+    def _analyze_sentence_lengths(self, scan: _StemScan) -> Dict[str, float]:
         """Analyze sentence length distribution patterns"""
         
-        word_counts = [len(stem.split()) for stem in stems if stem]
-        sentence_counts = [len(re.split(r'[.!?]+', stem)) for stem in stems if stem]
+        word_counts = scan.word_counts
+        sentence_counts = scan.sentence_counts
         
         if not word_counts:
             return {}
         
+        # Counts span a narrow range, so order statistics come from a histogram rather than a full sort
+        sorted_counts = _CountingOrder(word_counts)
+        percentile = self._percentile_of_sorted
+        
         return {
-            'word_count_mean': statistics.mean(word_counts),
-            'word_count_median': statistics.median(word_counts),
-            'word_count_std': statistics.stdev(word_counts) if len(word_counts) > 1 else 0,
-            'word_count_min': min(word_counts),
-            'word_count_max': max(word_counts),
-            'sentence_count_mean': statistics.mean(sentence_counts),
-            'sentence_count_median': statistics.median(sentence_counts),
+            'word_count_mean': _mean(word_counts),
+            'word_count_median': percentile(sorted_counts, 50),
+            'word_count_std': _stdev(word_counts) if len(word_counts) > 1 else 0,
+            'word_count_min': sorted_counts[0],
+            'word_count_max': sorted_counts[-1],
+            'sentence_count_mean': _mean(sentence_counts),
+            'sentence_count_median': percentile(_CountingOrder(sentence_counts), 50),
             # Percentile analysis using basic statistics
-            'word_count_p25': self._calculate_percentile(word_counts, 25),
-            'word_count_p75': self._calculate_percentile(word_counts, 75),
-            'word_count_p90': self._calculate_percentile(word_counts, 90)
+            'word_count_p25': percentile(sorted_counts, 25),
+            'word_count_p75': percentile(sorted_counts, 75),
+            'word_count_p90': percentile(sorted_counts, 90)
         }
     
     def _analyze_option_variance(self, questions: List[Dict]) -> float:
         """Analyze variance in option lengths within questions"""
         
-        variances = []
-        
-        for q in questions:
-            options = q.get('options', [])
-            if len(options) >= 4:
-                option_lengths = [len(opt.get('text', '').split()) for opt in options]
-                if len(set(option_lengths)) > 1:  # Only calculate if there's variance
-                    variances.append(statistics.variance(option_lengths))
-        
-        return statistics.mean(variances) if variances else 0.0
+        # Integer lengths give an exact variance, so zero marks questions with equal-length options
+        variances = [
+            variance
+            for variance in (
+                _int_variance([_wcount(opt.get('text', '')) for opt in options])
+                for options in (q.get('options', []) for q in questions)
+                if len(options) >= 4
+            )
+            if variance
+        ]
+        
+        return _mean(variances) if variances else 0.0
     
-    def _analyze_punctuation_patterns(self, stems: List[str]) -> Dict[str, float]:
+    def _analyze_punctuation_patterns(self, scan: _StemScan) -> Dict[str, float]:
         """Analyze punctuation usage patterns"""
         
-        total_stems = len(stems)
+        total_stems = scan.total_stems
         if total_stems == 0:
             return {}
         
-        # Count specific punctuation patterns
-        patterns = {
-            'question_marks': 0,
-            'exclamation_marks': 0,
-            'commas_per_stem': [],
-            'parentheses': 0,
-            'quotation_marks': 0,
-            'colons': 0,
-            'semicolons': 0,
-            'dashes': 0
-        }
-        
-        for stem in stems:
-            patterns['question_marks'] += stem.count('?')
-            patterns['exclamation_marks'] += stem.count('!')
-            patterns['commas_per_stem'].append(stem.count(','))
-            patterns['parentheses'] += stem.count('(') + stem.count(')')
-            patterns['quotation_marks'] += stem.count('"') + stem.count('"') + stem.count('"')
-            patterns['colons'] += stem.count(':')
-            patterns['semicolons'] += stem.count(';')
-            patterns['dashes'] += stem.count('—') + stem.count('-')
+        chars = scan.punctuation
         
         # Calculate frequencies
         return {
-            'question_mark_frequency': patterns['question_marks'] / total_stems,
-            'exclamation_frequency': patterns['exclamation_marks'] / total_stems,
-            'comma_frequency': statistics.mean(patterns['commas_per_stem']),
-            'parentheses_frequency': patterns['parentheses'] / total_stems,
-            'quotation_frequency': patterns['quotation_marks'] / total_stems,
-            'colon_frequency': patterns['colons'] / total_stems,
-            'semicolon_frequency': patterns['semicolons'] / total_stems,
-            'dash_frequency': patterns['dashes'] / total_stems
+            'question_mark_frequency': chars['?'] / total_stems,
+            'exclamation_frequency': chars['!'] / total_stems,
+            'comma_frequency': chars[','] / total_stems,
+            'parentheses_frequency': (chars['('] + chars[')']) / total_stems,
+            'quotation_frequency': (chars['"'] + chars['\u201c'] + chars['\u201d']) / total_stems,
+            'colon_frequency': chars[':'] / total_stems,
+            'semicolon_frequency': chars[';'] / total_stems,
+            'dash_frequency': (chars['—'] + chars['-']) / total_stems
         }
     
     def _analyze_distractor_patterns(self, questions: List[Dict]) -> Dict[str, float]:
@@ -189,20 +415,20 @@ class LGSStatisticalFingerprinter:
                 
                 if len(distractors) >= 3:
                     # Analyze length similarity among distractors
-                    distractor_lengths = [len(opt.get('text', '').split()) for opt in distractors]
+                    distractor_lengths = [_wcount(opt.get('text', '')) for opt in distractors]
                     if len(distractor_lengths) > 1:
-                        length_variance = statistics.variance(distractor_lengths)
+                        length_variance = _int_variance(distractor_lengths)
                         distractor_patterns['length_similarity'].append(length_variance)
                     
                     # Analyze first words
                     for distractor in distractors:
                         text = distractor.get('text', '').strip()
                         if text:
-                            first_word = text.split()[0].lower() if text.split() else ''
+                            first_word = text.split(None, 1)[0].lower()
                             distractor_patterns['first_word_patterns'][first_word] += 1
                             
                             # Check for numeric content
-                            if re.search(r'\d', text):
+                            if _DIGIT_RE.search(text):
                                 distractor_patterns['numeric_distractors'] += 1
                             
                             distractor_patterns['total_distractors'] += 1
@@ -210,7 +436,7 @@ class LGSStatisticalFingerprinter:
         # Calculate metrics
         result = {}
         if distractor_patterns['length_similarity']:
-            result['avg_length_variance'] = statistics.mean(distractor_patterns['length_similarity'])
+            result['avg_length_variance'] = _mean(distractor_patterns['length_similarity'])
         
         if distractor_patterns['total_distractors'] > 0:
             result['numeric_distractor_rate'] = distractor_patterns['numeric_distractors'] / distractor_patterns['total_distractors']
@@ -222,85 +448,53 @@ class LGSStatisticalFingerprinter:
         
         return result
     
-    def _analyze_numeric_patterns(self, stems: List[str]) -> Dict[str, float]:
+    def _analyze_numeric_patterns(self, scan: _StemScan) -> Dict[str, float]:
         """Analyze usage of numbers and mathematical content"""
         
-        total_stems = len(stems)
+        total_stems = scan.total_stems
         if total_stems == 0:
             return {}
         
-        numeric_patterns = {
-            'contains_numbers': 0,
-            'contains_fractions': 0,
-            'contains_percentages': 0,
-            'contains_equations': 0,
-            'number_ranges': []
-        }
-        
-        for stem in stems:
-            # Check for numbers
-            if re.search(r'\d', stem):
-                numeric_patterns['contains_numbers'] += 1
-                
-                # Extract all numbers
-                numbers = re.findall(r'\d+', stem)
-                for num_str in numbers:
-                    numeric_patterns['number_ranges'].append(int(num_str))
-            
-            # Check for fractions
-            if re.search(r'\d+/\d+', stem):
-                numeric_patterns['contains_fractions'] += 1
-            
-            # Check for percentages
-            if '%' in stem:
-                numeric_patterns['contains_percentages'] += 1
-            
-            # Check for equations
-            if re.search(r'[=+\-×÷]', stem):
-                numeric_patterns['contains_equations'] += 1
-        
         result = {
-            'number_frequency': numeric_patterns['contains_numbers'] / total_stems,
-            'fraction_frequency': numeric_patterns['contains_fractions'] / total_stems,
-            'percentage_frequency': numeric_patterns['contains_percentages'] / total_stems,
-            'equation_frequency': numeric_patterns['contains_equations'] / total_stems
+            'number_frequency': scan.contains_numbers / total_stems,
+            'fraction_frequency': scan.contains_fractions / total_stems,
+            'percentage_frequency': scan.contains_percentages / total_stems,
+            'equation_frequency': scan.contains_equations / total_stems
         }
         
         # Analyze number ranges if we have any
-        if numeric_patterns['number_ranges']:
-            numbers = numeric_patterns['number_ranges']
+        if scan.numbers:
+            numbers = scan.numbers
             result.update({
-                'number_range_mean': statistics.mean(numbers),
-                'number_range_median': statistics.median(numbers),
+                'number_range_mean': _mean(numbers),
+                'number_range_median': self._percentile_of_sorted(sorted(numbers), 50),
                 'number_range_max': max(numbers),
                 'small_numbers_rate': sum(1 for n in numbers if n <= 10) / len(numbers)
             })
         
         return result
     
-    def _analyze_subject_patterns(self, subject_data: Dict[str, List[str]]) -> Dict[str, Dict[str, float]]:
+    def _analyze_subject_patterns(self, subject_data: Dict[str, List[int]], scan: _StemScan) -> Dict[str, Dict[str, float]]:
         """Analyze subject-specific linguistic patterns"""
         
         subject_patterns = {}
         
-        for subject, stems in subject_data.items():
-            if len(stems) < 3:  # Skip subjects with too few samples
+        for subject, indices in subject_data.items():
+            if len(indices) < 3:  # Skip subjects with too few samples
                 continue
             
             # Subject-specific vocabulary
-            all_words = []
-            for stem in stems:
-                words = re.findall(r'\b\w+\b', stem.lower())
-                all_words.extend(words)
+            word_freq = Counter()
+            for i in indices:
+                word_freq.update(scan.words[i])
             
-            word_freq = Counter(all_words)
-            total_words = len(all_words)
+            total_words = sum(word_freq.values())
             
             # Calculate subject-specific metrics
             patterns = {
-                'avg_stem_length': statistics.mean([len(stem.split()) for stem in stems]),
-                'unique_vocabulary_rate': len(set(all_words)) / total_words if total_words > 0 else 0,
-                'technical_term_density': self._calculate_technical_density(stems, subject)
+                'avg_stem_length': _mean([scan.word_counts[i] for i in indices]),
+                'unique_vocabulary_rate': len(word_freq) / total_words if total_words > 0 else 0,
+                'technical_term_density': self._calculate_technical_density(indices, scan, subject)
             }
             
             # Top vocabulary for this subject
@@ -312,143 +506,117 @@ class LGSStatisticalFingerprinter:
         
         return subject_patterns
     
-    def _calculate_technical_density(self, stems: List[str], subject: str) -> float:
+    def _calculate_technical_density(self, indices: List[int], scan: _StemScan, subject: str) -> float:
         """Calculate density of technical/subject-specific terms"""
         
-        # Subject-specific technical term patterns
-        technical_patterns = {
-            'Matematik': [r'\b(fonksiyon|denklem|köklü|üslü|logaritma|integral)\b'],
-            'Türkçe': [r'\b(metafor|benzetme|kişileştirme|anlam|sözcük)\b'],
-            'Fen Bilimleri': [r'\b(molekül|atom|enerji|kuvvet|hız)\b'],
-            'Sosyal Bilgiler': [r'\b(tarih|coğrafya|nüfus|iklim|kültür)\b']
-        }
-        
-        patterns = technical_patterns.get(subject, [])
-        if not patterns:
+        pattern = _TECH_RES.get(subject)
+        if pattern is None:
             return 0.0
         
         total_terms = 0
         total_words = 0
         
-        for stem in stems:
-            words = stem.split()
-            total_words += len(words)
-            
-            for pattern in patterns:
-                total_terms += len(re.findall(pattern, stem.lower()))
+        for i in indices:
+            total_words += scan.word_counts[i]
+            total_terms += len(pattern.findall(scan.stems_lower[i]))
         
         return total_terms / total_words if total_words > 0 else 0.0
     
-    def _extract_difficulty_indicators(self, questions: List[Dict]) -> Dict[str, List[str]]:
+    def _extract_difficulty_indicators(self, scan: _StemScan, difficulties: List[str]) -> Dict[str, List[str]]:
         """Extract linguistic patterns that indicate difficulty levels"""
         
-        difficulty_indicators = {
-            'KOLAY': [],
-            'ORTA': [],
-            'ZOR': []
+        phrase_counts = {
+            'KOLAY': Counter(),
+            'ORTA': Counter(),
+            'ZOR': Counter()
         }
         
-        for q in questions:
-            difficulty = q.get('difficulty_level', 'ORTA')
-            stem = q.get('stem', '')
-            
-            # Extract key phrases that might indicate difficulty
-            phrases = self._extract_key_phrases(stem)
-            difficulty_indicators[difficulty].extend(phrases)
+        for words, difficulty in zip(scan.words, difficulties):
+            # Count key phrases that might indicate difficulty
+            self._update_key_phrases(words, phrase_counts[difficulty])
         
         # Get most common phrases for each difficulty
-        for difficulty in difficulty_indicators:
-            phrase_counts = Counter(difficulty_indicators[difficulty])
-            difficulty_indicators[difficulty] = [
-                phrase for phrase, count in phrase_counts.most_common(10)
-            ]
-        
-        return difficulty_indicators
+        return {
+            difficulty: [' '.join(phrase) for phrase, count in counts.most_common(10)]
+            for difficulty, counts in phrase_counts.items()
+        }
     
-    def _extract_key_phrases(self, text: str) -> List[str]:
-        """Extract key phrases from text"""
-        # Simple extraction of 2-3 word phrases
-        words = re.findall(r'\b\w+\b', text.lower())
-        phrases = []
-        
-        for i in range(len(words) - 1):
-            phrases.append(f"{words[i]} {words[i+1]}")
-            if i < len(words) - 2:
-                phrases.append(f"{words[i]} {words[i+1]} {words[i+2]}")
-        
-        return phrases
+    def _update_key_phrases(self, words: List[str], counter: Counter):
+        """Count the 2-3 word phrases of a tokenized text into counter, keyed by word tuples"""
+        # Sliding windows interleaved bigram, trigram, ... so first-seen (tie-break) order is unchanged
+        counter.update(chain.from_iterable(zip(zip(words, words[1:]), zip(words, words[1:], words[2:]))))
+        if len(words) > 1:
+            counter[(words[-2], words[-1])] += 1
     
-    def _analyze_vocabulary_frequency(self, stems: List[str]) -> Dict[str, float]:
+    def _analyze_vocabulary_frequency(self, scan: _StemScan) -> Dict[str, float]:
         """Analyze overall vocabulary frequency patterns"""
         
-        all_words = []
-        for stem in stems:
-            words = re.findall(r'\b\w+\b', stem.lower())
-            all_words.extend(words)
-        
-        word_freq = Counter(all_words)
-        total_words = len(all_words)
+        word_freq = scan.word_freq
+        total_words = scan.total_words
         
         if total_words == 0:
             return {}
         
         # Calculate frequency metrics
         result = {
-            'vocabulary_size': len(set(all_words)),
-            'avg_word_frequency': total_words / len(set(all_words)) if all_words else 0,
+            'vocabulary_size': len(word_freq),
+            'avg_word_frequency': total_words / len(word_freq),
             'hapax_legomena_rate': sum(1 for count in word_freq.values() if count == 1) / len(word_freq)
         }
         
         # Top 10 most frequent words
-        top_words = word_freq.most_common(10)
-        for i, (word, count) in enumerate(top_words):
-            result[f'top_{i+1}_word'] = word
-            result[f'top_{i+1}_freq'] = count / total_words
+        top_words = word_freq.most_common(len(_TOP_KEYS))
+        for (word_key, freq_key), (word, count) in zip(_TOP_KEYS, top_words):
+            result[word_key] = word
+            result[freq_key] = count / total_words
         
         return result
     
-    def _analyze_structural_patterns(self, stems: List[str]) -> Dict[str, float]:
+    def _analyze_structural_patterns(self, scan: _StemScan) -> Dict[str, float]:
         """Analyze structural patterns in question formation"""
         
-        total_stems = len(stems)
+        total_stems = scan.total_stems
         if total_stems == 0:
             return {}
         
-        patterns = {
-            'starts_with_question': 0,
-            'contains_conditional': 0,
-            'contains_comparison': 0,
-            'contains_enumeration': 0,
-            'multiple_sentences': 0
-        }
-        
-        for stem in stems:
-            # Check structural patterns
-            if re.match(r'^(Ne|Nasıl|Hangi|Kim|Nerede|Neden)', stem):
-                patterns['starts_with_question'] += 1
-            
-            if re.search(r'\b(eğer|ise|olsaydı|durumunda)\b', stem.lower()):
-                patterns['contains_conditional'] += 1
-            
-            if re.search(r'\b(daha|en|göre|karşı|benzer)\b', stem.lower()):
-                patterns['contains_comparison'] += 1
-            
-            if re.search(r'\b(birinci|ikinci|üçüncü|I\.|II\.|III\.)\b', stem):
-                patterns['contains_enumeration'] += 1
-            
-            if len(re.split(r'[.!?]+', stem)) > 2:
-                patterns['multiple_sentences'] += 1
+        multiple_sentences = sum(1 for count in scan.sentence_counts if count > 2)
         
         return {
-            'question_start_rate': patterns['starts_with_question'] / total_stems,
-            'conditional_rate': patterns['contains_conditional'] / total_stems,
-            'comparison_rate': patterns['contains_comparison'] / total_stems,
-            'enumeration_rate': patterns['contains_enumeration'] / total_stems,
-            'multi_sentence_rate': patterns['multiple_sentences'] / total_stems
+            'question_start_rate': scan.starts_with_question / total_stems,
+            'conditional_rate': scan.contains_conditional / total_stems,
+            'comparison_rate': scan.contains_comparison / total_stems,
+            'enumeration_rate': scan.contains_enumeration / total_stems,
+            'multi_sentence_rate': multiple_sentences / total_stems
         }
     
     def calculate_conformance_score(self, question: Dict) -> float:
         """Calculate how well a question conforms to LGS fingerprint"""
+        return self._score_conformance(question, self._conformance_targets())
+    
+    def calculate_conformance_scores(self, questions: Iterable[Dict]) -> List[float]:
+        """Score a batch of candidate questions, reading the fingerprint targets once"""
+        targets = self._conformance_targets()
+        return [self._score_conformance(q, targets) for q in questions]
+    
+    def _conformance_targets(self) -> _ConformanceTargets:
+        """Collect the fingerprint values every conformance check compares against"""
+        
+        fingerprint = self.fingerprint
+        expected_punctuation = fingerprint.punctuation_patterns
+        
+        return _ConformanceTargets(
+            word_count_mean=fingerprint.sentence_length_dist.get('word_count_mean', 25),
+            word_count_std=fingerprint.sentence_length_dist.get('word_count_std', 10),
+            option_length_variance=fingerprint.option_length_variance,
+            punctuation=[(name, expected_punctuation[name]) for name in _CONFORMANCE_PUNCTUATION if name in expected_punctuation],
+            subject_stem_lengths={
+                subject: patterns.get('avg_stem_length', 25)
+                for subject, patterns in fingerprint.subject_specific_patterns.items()
+            }
+        )
+    
+    def _score_conformance(self, question: Dict, targets: _ConformanceTargets) -> float:
+        """Conformance of one question against precollected fingerprint targets"""
         
         stem = question.get('stem', '')
         options = question.get('options', [])
@@ -456,9 +624,9 @@ class LGSStatisticalFingerprinter:
         conformance_scores = []
         
         # Check sentence length conformance
-        word_count = len(stem.split())
-        expected_mean = self.fingerprint.sentence_length_dist.get('word_count_mean', 25)
-        expected_std = self.fingerprint.sentence_length_dist.get('word_count_std', 10)
+        word_count = _wcount(stem)
+        expected_mean = targets.word_count_mean
+        expected_std = targets.word_count_std
         
         # Calculate z-score for word count
         if expected_std > 0:
@@ -470,14 +638,14 @@ class LGSStatisticalFingerprinter:
         conformance_scores.append(length_conformance)
         
         # Check punctuation conformance
-        punct_score = self._check_punctuation_conformance(stem)
+        punct_score = self._punctuation_conformance(stem, targets.punctuation)
         conformance_scores.append(punct_score)
         
         # Check option length variance conformance
         if len(options) >= 4:
-            option_lengths = [len(opt.get('text', '').split()) for opt in options]
-            actual_variance = statistics.variance(option_lengths) if len(set(option_lengths)) > 1 else 0
-            expected_variance = self.fingerprint.option_length_variance
+            option_lengths = [_wcount(opt.get('text', '')) for opt in options]
+            actual_variance = _int_variance(option_lengths) if len(option_lengths) > 1 else 0
+            expected_variance = targets.option_length_variance
             
             # Variance conformance (closer to expected = higher score)
             if expected_variance > 0:
@@ -488,51 +656,50 @@ class LGSStatisticalFingerprinter:
             conformance_scores.append(variance_ratio)
         
         # Check subject-specific conformance if available
-        subject = question.get('subject', '')
-        if subject in self.fingerprint.subject_specific_patterns:
-            subject_patterns = self.fingerprint.subject_specific_patterns[subject]
-            expected_length = subject_patterns.get('avg_stem_length', 25)
-            
+        expected_length = targets.subject_stem_lengths.get(question.get('subject', ''))
+        if expected_length is not None:
             length_diff = abs(word_count - expected_length) / expected_length
             subject_conformance = max(0, 1 - length_diff)
             conformance_scores.append(subject_conformance)
         
         # Return weighted average
-        return statistics.mean(conformance_scores)
+        return _mean(conformance_scores)
     
     def _check_punctuation_conformance(self, stem: str) -> float:
         """Check how well punctuation matches LGS patterns"""
-        
-        expected_patterns = self.fingerprint.punctuation_patterns
+        return self._punctuation_conformance(stem, self._conformance_targets().punctuation)
+    
+    @staticmethod
+    def _punctuation_conformance(stem: str, expected: List[Tuple[str, float]]) -> float:
+        """Punctuation conformance of a stem against (pattern name, expected frequency) pairs"""
         
         actual_patterns = {
             'comma_frequency': stem.count(','),
             'question_mark_frequency': stem.count('?'),
             'parentheses_frequency': stem.count('(') + stem.count(')'),
-            'quotation_frequency': stem.count('"')
+            'quotation_frequency': stem.count('"') + stem.count('\u201c') + stem.count('\u201d')
         }
         
         scores = []
         
-        for pattern_name, expected_freq in expected_patterns.items():
-            if pattern_name in actual_patterns:
-                actual_freq = actual_patterns[pattern_name]
-                
-                # Calculate conformance (closer to expected = higher score)
-                if expected_freq == 0 and actual_freq == 0:
-                    scores.append(1.0)
-                elif expected_freq == 0:
-                    scores.append(0.5)  # Penalty for unexpected punctuation
-                else:
-                    conformance = 1 - min(1, abs(actual_freq - expected_freq) / expected_freq)
-                    scores.append(conformance)
+        for pattern_name, expected_freq in expected:
+            actual_freq = actual_patterns[pattern_name]
+            
+            # Calculate conformance (closer to expected = higher score)
+            if expected_freq == 0 and actual_freq == 0:
+                scores.append(1.0)
+            elif expected_freq == 0:
+                scores.append(0.5)  # Penalty for unexpected punctuation
+            else:
+                conformance = 1 - min(1, abs(actual_freq - expected_freq) / expected_freq)
+                scores.append(conformance)
         
-        return statistics.mean(scores) if scores else 0.5
+        return _mean(scores) if scores else 0.5
     
     def save_fingerprint(self, filepath: str):
         """Save fingerprint to file"""
         with open(filepath, 'wb') as f:
-            pickle.dump(self.fingerprint, f)
+            pickle.dump(self.fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
         print(f"📁 Fingerprint saved to {filepath}")
     
     @classmethod
@@ -541,7 +708,7 @@ class LGSStatisticalFingerprinter:
         with open(filepath, 'rb') as f:
             fingerprint = pickle.load(f)
         
-        # Create instance with empty questions (fingerprint already computed)
+        # Create instance with empty questions (fingerprint already computed, so the build short-circuits)
         instance = cls([])
         instance.fingerprint = fingerprint
         return instance
@@ -597,10 +764,7 @@ def main():
     jsonl_path = Path('/app/comprehensive_lgs_2018_2025.jsonl')
     
     if jsonl_path.exists():
-        with open(jsonl_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    questions.append(json.loads(line.strip()))
+        questions = list(_iter_questions(jsonl_path))
     else:
         print("❌ No authentic questions found, using empty dataset")
     
@@ -4,16 +4,40 @@ Student Performance Feedback System
 Tracks student performance to improve question quality and enable adaptive difficulty
 """
 
+import asyncio
 import json
+import sys
 import time
-import statistics
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
-from collections import defaultdict
+import math
+import heapq
+from typing import Deque, Dict, Iterable, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from collections import Counter, defaultdict, deque
+from itertools import islice
 from datetime import datetime, timedelta
 import logging
+from operator import mul
 
-@dataclass 
+from app.core.config import settings
+
+# Geometric decay weights per (decay, window), oldest score first, with the total of each length-k suffix
+_DECAY_WEIGHTS: Dict[Tuple[float, int], Tuple[List[float], List[float]]] = {}
+
+def _decay_weights(decay: float, window: int) -> Tuple[List[float], List[float]]:
+    """Memoized weights for a full window and the sum of the newest k weights at index k"""
+    cached = _DECAY_WEIGHTS.get((decay, window))
+    if cached is None:
+        weights = [decay ** i for i in range(window)]
+        weights.reverse()  # Most recent gets highest weight
+        totals = [0.0] + [sum(weights[window - k:]) for k in range(1, window + 1)]
+        cached = _DECAY_WEIGHTS[(decay, window)] = (weights, totals)
+    return cached
+
+def _intern(value: Any) -> Any:
+    """Intern string values; ids and answers from untyped payloads may arrive as numbers"""
+    return sys.intern(value) if type(value) is str else value
+
+@dataclass(slots=True)
 class StudentAnswer:
     """Individual answer record"""
     student_id: str
@@ -28,8 +52,12 @@ class StudentAnswer:
     topic: str
     difficulty: str
     question_source: str  # "LGS", "MILK", etc.
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict record of every field, in declaration order"""
+        return {name: getattr(self, name) for name in self.__slots__}
 
-@dataclass
+@dataclass(slots=True)
 class QuestionPerformance:
     """Performance metrics for a specific question"""
     question_id: str
@@ -46,30 +74,166 @@ class QuestionPerformance:
     wrong_option_distribution: Dict[str, int]
     student_ability_correlation: float
     
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict export; explicit field reads instead of asdict's recursive deep copy"""
+        return {
+            'question_id': self.question_id,
+            'total_attempts': self.total_attempts,
+            'correct_attempts': self.correct_attempts,
+            'correct_rate': self.correct_rate,
+            'avg_time_seconds': self.avg_time_seconds,
+            'median_time_seconds': self.median_time_seconds,
+            'std_time_seconds': self.std_time_seconds,
+            'empirical_difficulty': self.empirical_difficulty,
+            'discrimination_index': self.discrimination_index,
+            'quality_score': self.quality_score,
+            'flagged_for_review': self.flagged_for_review,
+            'wrong_option_distribution': dict(self.wrong_option_distribution),
+            'student_ability_correlation': self.student_ability_correlation
+        }
+    
+@dataclass(slots=True)
+class QuestionAggState:
+    """Running per-question aggregates, updated in O(log n) per answer instead of rescanning history"""
+    total_attempts: int = 0
+    correct_attempts: int = 0
+    mean_time: float = 0.0
+    m2_time: float = 0.0  # Welford sum of squared deviations
+    lower_times: List[float] = field(default_factory=list)  # Max-heap (negated) of the lower half
+    upper_times: List[float] = field(default_factory=list)  # Min-heap of the upper half
+    wrong_options: Counter = field(default_factory=Counter)
+    option_counts: Counter = field(default_factory=Counter)  # Every selection, for distractor analysis
+    subject: str = ''
+    correct_answer: str = ''
+    # Columns of the answers' student ids and correctness, read by the discrimination index
+    student_ids: List[str] = field(default_factory=list)
+    correct_flags: bytearray = field(default_factory=bytearray)
+    discrimination_index: float = 0.5  # Memoized; recomputed as attempts grow
+    discrimination_attempts: int = 0  # Attempts when discrimination_index was last computed
+    
+    def add(self, answer: StudentAnswer):
+        """Fold one answer into the aggregates"""
+        if not self.total_attempts:
+            self.subject = answer.subject
+            self.correct_answer = answer.correct_answer
+        self.student_ids.append(answer.student_id)
+        self.correct_flags.append(answer.is_correct)
+        self.option_counts[answer.selected_answer] += 1
+        self.total_attempts += 1
+        if answer.is_correct:
+            self.correct_attempts += 1
+        else:
+            self.wrong_options[answer.selected_answer] += 1
+        
+        # Welford's recurrence for mean and variance of time spent
+        t = answer.time_spent_seconds
+        delta = t - self.mean_time
+        self.mean_time += delta / self.total_attempts
+        self.m2_time += delta * (t - self.mean_time)
+        
+        # Two heaps keep the running median; the lower half holds the extra element
+        if self.lower_times and t > -self.lower_times[0]:
+            heapq.heappush(self.upper_times, t)
+        else:
+            heapq.heappush(self.lower_times, -t)
+        if len(self.lower_times) > len(self.upper_times) + 1:
+            heapq.heappush(self.upper_times, -heapq.heappop(self.lower_times))
+        elif len(self.upper_times) > len(self.lower_times):
+            heapq.heappush(self.lower_times, -heapq.heappop(self.upper_times))
+    
+    @property
+    def median_time(self) -> float:
+        """Median time spent, matching statistics.median"""
+        if len(self.lower_times) > len(self.upper_times):
+            return -self.lower_times[0]
+        return (-self.lower_times[0] + self.upper_times[0]) / 2
+    
+    @property
+    def std_time(self) -> float:
+        """Sample standard deviation of time spent"""
+        return math.sqrt(self.m2_time / (self.total_attempts - 1)) if self.total_attempts > 1 else 0
+
+@dataclass(slots=True)
 class StudentProfile:
     """Student proficiency profile"""
     student_id: str
     estimated_ability: Dict[str, float]  # per subject
-    recent_performance: Dict[str, List[float]]  # last 10 scores per subject
+    recent_performance: Dict[str, Deque[float]]  # last 10 scores per subject
     improvement_trend: Dict[str, str]  # "improving", "stable", "declining"
     time_based_decay: float
     last_updated: float
     total_questions_answered: int
     preferred_difficulty: Dict[str, str]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict export; explicit field reads instead of asdict's recursive deep copy"""
+        return {
+            'student_id': self.student_id,
+            'estimated_ability': dict(self.estimated_ability),
+            'recent_performance': {subject: list(scores) for subject, scores in self.recent_performance.items()},
+            'improvement_trend': dict(self.improvement_trend),
+            'time_based_decay': self.time_based_decay,
+            'last_updated': self.last_updated,
+            'total_questions_answered': self.total_questions_answered,
+            'preferred_difficulty': dict(self.preferred_difficulty)
+        }
 
 class PerformanceTracker:
     """Tracks and analyzes student performance"""
     
-    def __init__(self):
-        self.answers: List[StudentAnswer] = []
+    RECENT_WINDOW = 10  # Scores kept per subject in a student's recent performance
+    RECENT_AVERAGE_WINDOW = 5  # Newest scores averaged for adaptive difficulty
+    MIN_DISCRIMINATION_ATTEMPTS = 10  # Below this the discrimination index is a neutral 0.5
+    DISCRIMINATION_MAX_STALE_ATTEMPTS = 256  # Recompute at least this often once attempts stop doubling
+    MAX_IN_MEMORY_ANSWERS = 100_000  # Raw answers kept resident; every metric comes from running aggregates
+    SPILL_BATCH = 10_000  # Oldest answers moved out of memory together once the limit is passed
+    
+    def __init__(self, spill_path: Optional[str] = None):
+        self.answers: List[StudentAnswer] = []  # Most recent raw answers, oldest first
+        self.spill_path = spill_path  # Append-only JSONL receiving evicted answers; None keeps every answer resident
+        self._pending_spill: List[StudentAnswer] = []  # Evicted answers awaiting the background writer
+        self._spill_task: Optional[asyncio.Task] = None
         self.question_performance: Dict[str, QuestionPerformance] = {}
         self.student_profiles: Dict[str, StudentProfile] = {}
         self.performance_cache: Dict[str, Any] = {}
+        # Reverse indexes from question/student ids to the cache keys that depend on them
+        self._question_cache_keys: Dict[str, Set[str]] = defaultdict(set)
+        self._student_cache_keys: Dict[str, Set[str]] = defaultdict(set)
+        self.question_aggregates: Dict[str, QuestionAggState] = {}
+        self.student_subject_stats: Dict[Tuple[str, str], List[int]] = {}  # (student, subject) -> [attempts, correct]
+        self.subject_totals: Dict[str, List[float]] = {}  # subject -> [attempts, correct, time_spent_sum]
+        self._trend_counts: Dict[str, Counter] = defaultdict(Counter)  # subject -> students per improvement trend
+        self._recent_window_sums: Dict[Tuple[str, str], float] = {}  # (student, subject) -> sum of newest scores
+        self._total_answers = 0
+        self._total_correct = 0
         
     def record_answer(self, answer: StudentAnswer):
         """Record a student answer and update metrics"""
+        # Request payloads carry fresh string objects; interning shares one object per id across
+        # stored answers and aggregate keys, so repeated lookups hit the identity fast path
+        answer.student_id = _intern(answer.student_id)
+        answer.question_id = _intern(answer.question_id)
+        answer.subject = _intern(answer.subject)
+        answer.selected_answer = _intern(answer.selected_answer)
+        
         self.answers.append(answer)
+        self._total_answers += 1
+        self._total_correct += answer.is_correct
+        
+        # Update the student's running tally for this subject
+        stats = self.student_subject_stats.get((answer.student_id, answer.subject))
+        if stats is None:
+            stats = self.student_subject_stats[(answer.student_id, answer.subject)] = [0, 0]
+        stats[0] += 1
+        stats[1] += answer.is_correct
+        
+        # Update the subject-wide totals behind the trend report
+        totals = self.subject_totals.get(answer.subject)
+        if totals is None:
+            totals = self.subject_totals[answer.subject] = [0, 0, 0]
+        totals[0] += 1
+        totals[1] += answer.is_correct
+        totals[2] += answer.time_spent_seconds
         
         # Update question performance
         self._update_question_performance(answer)
@@ -79,44 +243,88 @@ class PerformanceTracker:
         
         # Clear relevant caches
         self._invalidate_cache(answer.question_id, answer.student_id)
+        
+        # Spill only once the answer is fully recorded, and only when it has somewhere to go
+        if self.spill_path and len(self.answers) > self.MAX_IN_MEMORY_ANSWERS:
+            self._spill_oldest_answers()
+    
+    def _spill_oldest_answers(self):
+        """Evict the oldest batch of raw answers and queue them for appending to spill_path"""
+        self._pending_spill.extend(self.answers[:self.SPILL_BATCH])
+        del self.answers[:self.SPILL_BATCH]
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_spill_sync()  # No event loop to block
+            return
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = loop.create_task(self._drain_spill())
+    
+    async def flush_spill(self):
+        """Wait until every evicted answer has been written to spill_path"""
+        if self._spill_task is not None and not self._spill_task.done():
+            await self._spill_task
+        await self._drain_spill()
+    
+    async def _drain_spill(self):
+        """Write queued evicted answers to spill_path off the event loop"""
+        while self._pending_spill:
+            batch, self._pending_spill = self._pending_spill, []
+            await asyncio.to_thread(self._write_spill, batch)
+    
+    def flush_spill_sync(self):
+        """Write queued evicted answers to spill_path on the calling thread"""
+        batch, self._pending_spill = self._pending_spill, []
+        if batch:
+            self._write_spill(batch)
+    
+    def _write_spill(self, answers: List[StudentAnswer]):
+        """Append answers to spill_path as JSONL; failures are logged rather than raised"""
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(a.to_dict(), ensure_ascii=False) + '\n' for a in answers)
+        except OSError as e:
+            logging.error(f"Answer spill write error ({len(answers)} answers to {self.spill_path}): {e}")
     
     def _update_question_performance(self, answer: StudentAnswer):
         """Update performance metrics for a question"""
         question_id = answer.question_id
         
-        # Get all answers for this question
-        question_answers = [a for a in self.answers if a.question_id == question_id]
-        
-        if not question_answers:
-            return
+        # Fold the new answer into the question's running aggregates
+        agg = self.question_aggregates.get(question_id)
+        if agg is None:
+            agg = self.question_aggregates[question_id] = QuestionAggState()
+        agg.add(answer)
         
         # Calculate basic metrics
-        total_attempts = len(question_answers)
-        correct_attempts = sum(1 for a in question_answers if a.is_correct)
+        total_attempts = agg.total_attempts
+        correct_attempts = agg.correct_attempts
         correct_rate = correct_attempts / total_attempts
         
-        times = [a.time_spent_seconds for a in question_answers]
-        avg_time = statistics.mean(times)
-        median_time = statistics.median(times)
-        std_time = statistics.stdev(times) if len(times) > 1 else 0
+        avg_time = agg.mean_time
+        median_time = agg.median_time
+        std_time = agg.std_time
         
         # Calculate empirical difficulty (inverse of correct rate)
         empirical_difficulty = 1.0 - correct_rate
         
-        # Calculate discrimination index (simplified)
-        discrimination_index = self._calculate_discrimination_index(question_answers)
+        # Calculate discrimination index (simplified); it settles as attempts grow, so the
+        # memoized value is reused until attempts double or enough new answers arrive
+        if total_attempts < self.MIN_DISCRIMINATION_ATTEMPTS:
+            discrimination_index = 0.5  # Too few attempts to rank students
+        else:
+            last = agg.discrimination_attempts
+            if total_attempts >= 2 * last or total_attempts - last >= self.DISCRIMINATION_MAX_STALE_ATTEMPTS:
+                agg.discrimination_index = self._calculate_discrimination_index(agg)
+                agg.discrimination_attempts = total_attempts
+            discrimination_index = agg.discrimination_index
         
         # Calculate quality score
         quality_score = self._calculate_quality_score(
             correct_rate, discrimination_index, total_attempts
         )
         
-        # Analyze wrong option distribution
-        wrong_option_dist = defaultdict(int)
-        for a in question_answers:
-            if not a.is_correct:
-                wrong_option_dist[a.selected_answer] += 1
-        
         # Update question performance record
         self.question_performance[question_id] = QuestionPerformance(
             question_id=question_id,
@@ -130,54 +338,48 @@ class PerformanceTracker:
             discrimination_index=discrimination_index,
             quality_score=quality_score,
             flagged_for_review=quality_score < 0.3,
-            wrong_option_distribution=dict(wrong_option_dist),
+            wrong_option_distribution=dict(agg.wrong_options),
             student_ability_correlation=0.0  # TODO: Calculate correlation
         )
     
-    def _calculate_discrimination_index(self, answers: List[StudentAnswer]) -> float:
+    def _calculate_discrimination_index(self, agg: QuestionAggState) -> float:
         """Calculate discrimination index for a question"""
-        if len(answers) < 10:  # Need sufficient data
+        if agg.total_attempts < self.MIN_DISCRIMINATION_ATTEMPTS:  # Need sufficient data
             return 0.5
         
-        # Group students by overall ability (simplified)
-        student_scores = defaultdict(list)
-        for answer in answers:
-            student_id = answer.student_id
-            # Get student's overall performance in this subject
-            student_answers = [a for a in self.answers 
-                             if a.student_id == student_id and a.subject == answer.subject]
-            if student_answers:
-                overall_score = sum(a.is_correct for a in student_answers) / len(student_answers)
-                student_scores[student_id] = overall_score
+        # Group students by overall ability (simplified), in first-answer order
+        student_scores = {}
+        subject_stats = self.student_subject_stats
+        for student_id in dict.fromkeys(agg.student_ids):
+            # Get student's overall performance in this subject; a question_id recorded under
+            # another subject can list students with no answers in this one
+            stats = subject_stats.get((student_id, agg.subject))
+            if stats:
+                attempts, correct = stats
+                student_scores[student_id] = correct / attempts
         
         if len(student_scores) < 6:
             return 0.5
         
-        # Split into high and low ability groups
+        # Split into the conventional top and bottom 27% ability groups
         sorted_students = sorted(student_scores.items(), key=lambda x: x[1])
-        n = len(sorted_students)
-        
-        low_ability = sorted_students[:n//3]
-        high_ability = sorted_students[-n//3:]
-        
-        # Calculate correct rates for each group on this question
-        high_ability_ids = set(student_id for student_id, _ in high_ability)
-        low_ability_ids = set(student_id for student_id, _ in low_ability)
-        
-        high_correct = sum(1 for a in answers if a.student_id in high_ability_ids and a.is_correct)
-        low_correct = sum(1 for a in answers if a.student_id in low_ability_ids and a.is_correct)
-        
-        high_total = sum(1 for a in answers if a.student_id in high_ability_ids)
-        low_total = sum(1 for a in answers if a.student_id in low_ability_ids)
-        
-        if high_total == 0 or low_total == 0:
-            return 0.5
-        
-        high_rate = high_correct / high_total
-        low_rate = low_correct / low_total
-        
-        # Discrimination index is difference between high and low ability groups
-        return high_rate - low_rate
+        group_size = max(1, int(0.27 * len(sorted_students)))
+        
+        low_ability_ids = set(student_id for student_id, _ in sorted_students[:group_size])
+        high_ability_ids = set(student_id for student_id, _ in sorted_students[-group_size:])
+        
+        # Count correct answers from each group on this question in one pass
+        high_correct = 0
+        low_correct = 0
+        for student_id, is_correct in zip(agg.student_ids, agg.correct_flags):
+            if is_correct:
+                if student_id in high_ability_ids:
+                    high_correct += 1
+                elif student_id in low_ability_ids:
+                    low_correct += 1
+        
+        # Classical item analysis D = (N_H - N_L) / C with C students per group
+        return max(-1.0, min(1.0, (high_correct - low_correct) / group_size))
     
     def _calculate_quality_score(self, correct_rate: float, discrimination: float, attempts: int) -> float:
         """Calculate composite quality score"""
@@ -213,42 +415,53 @@ class PerformanceTracker:
         
         profile = self.student_profiles[student_id]
         
-        # Update recent performance
-        if subject not in profile.recent_performance:
-            profile.recent_performance[subject] = []
+        # Update recent performance; the bounded deque keeps only the last 10 scores
+        recent_scores = profile.recent_performance.get(subject)
+        if recent_scores is None:
+            recent_scores = profile.recent_performance[subject] = deque(maxlen=self.RECENT_WINDOW)
         
         score = 1.0 if answer.is_correct else 0.0
-        profile.recent_performance[subject].append(score)
+        recent_scores.append(score)
+        count = len(recent_scores)
         
-        # Keep only last 10 performances
-        profile.recent_performance[subject] = profile.recent_performance[subject][-10:]
+        # Roll the sum of the newest RECENT_AVERAGE_WINDOW scores forward by the score leaving the window
+        window_key = (student_id, subject)
+        window_sum = self._recent_window_sums.get(window_key, 0.0) + score
+        if count > self.RECENT_AVERAGE_WINDOW:
+            window_sum -= recent_scores[-self.RECENT_AVERAGE_WINDOW - 1]
+        self._recent_window_sums[window_key] = window_sum
         
         # Calculate estimated ability for this subject
-        recent_scores = profile.recent_performance[subject]
         if recent_scores:
-            # Weight recent scores more heavily
-            weights = [profile.time_based_decay ** i for i in range(len(recent_scores))]
-            weights.reverse()  # Most recent gets highest weight
+            # Weight recent scores more heavily, using the newest len(recent_scores) cached weights
+            weights, totals = _decay_weights(profile.time_based_decay, self.RECENT_WINDOW)
             
-            weighted_sum = sum(score * weight for score, weight in zip(recent_scores, weights))
-            weight_sum = sum(weights)
+            weighted_sum = sum(map(mul, recent_scores, islice(weights, self.RECENT_WINDOW - count, None)))
             
-            profile.estimated_ability[subject] = weighted_sum / weight_sum
+            profile.estimated_ability[subject] = weighted_sum / totals[count]
         
         # Calculate improvement trend
-        if len(recent_scores) >= 5:
-            first_half = recent_scores[:len(recent_scores)//2]
-            second_half = recent_scores[len(recent_scores)//2:]
-            
-            first_avg = statistics.mean(first_half)
-            second_avg = statistics.mean(second_half)
+        if count >= 5:
+            # Plain float means; statistics.mean's exact Fraction arithmetic dominated ingestion
+            half = count // 2
+            first_avg = sum(islice(recent_scores, half)) / half
+            second_avg = sum(islice(recent_scores, half, None)) / (count - half)
             
             if second_avg > first_avg + 0.1:
-                profile.improvement_trend[subject] = "improving"
+                trend = "improving"
             elif second_avg < first_avg - 0.1:
-                profile.improvement_trend[subject] = "declining"
+                trend = "declining"
             else:
-                profile.improvement_trend[subject] = "stable"
+                trend = "stable"
+            
+            # Move the student between the subject's trend tallies only when the trend changes
+            previous_trend = profile.improvement_trend.get(subject)
+            if previous_trend != trend:
+                trend_counts = self._trend_counts[subject]
+                if previous_trend is not None:
+                    trend_counts[previous_trend] -= 1
+                trend_counts[trend] += 1
+                profile.improvement_trend[subject] = trend
         
         # Update preferred difficulty based on performance
         if subject in profile.estimated_ability:
@@ -263,15 +476,20 @@ class PerformanceTracker:
         profile.total_questions_answered += 1
         profile.last_updated = time.time()
     
+    def _cache_result(self, key: str, value: Any, question_ids: Iterable[str] = (), student_ids: Iterable[str] = ()):
+        """Cache a derived result, registering the questions and students it depends on"""
+        self.performance_cache[key] = value
+        for question_id in question_ids:
+            self._question_cache_keys[question_id].add(key)
+        for student_id in student_ids:
+            self._student_cache_keys[student_id].add(key)
+    
     def _invalidate_cache(self, question_id: str, student_id: str):
         """Invalidate relevant caches"""
-        cache_keys_to_remove = []
-        for key in self.performance_cache:
-            if question_id in key or student_id in key:
-                cache_keys_to_remove.append(key)
+        cache_keys_to_remove = self._question_cache_keys.pop(question_id, set()) | self._student_cache_keys.pop(student_id, set())
         
         for key in cache_keys_to_remove:
-            del self.performance_cache[key]
+            self.performance_cache.pop(key, None)
     
     def get_question_quality_metrics(self, question_id: str) -> Optional[QuestionPerformance]:
         """Get quality metrics for a specific question"""
@@ -281,6 +499,15 @@ class PerformanceTracker:
         """Get proficiency profile for a student"""
         return self.student_profiles.get(student_id)
     
+    def get_recent_average(self, student_id: str, subject: str) -> Optional[float]:
+        """Mean of a student's newest RECENT_AVERAGE_WINDOW scores in a subject, from the rolling sum"""
+        window_sum = self._recent_window_sums.get((student_id, subject))
+        if window_sum is None:
+            return None
+        
+        count = len(self.student_profiles[student_id].recent_performance[subject])
+        return window_sum / min(count, self.RECENT_AVERAGE_WINDOW)
+    
     def get_recommended_difficulty(self, student_id: str, subject: str) -> str:
         """Get recommended difficulty for a student in a subject"""
         profile = self.student_profiles.get(student_id)
@@ -307,45 +534,38 @@ class PerformanceTracker:
             'stable_students': 0
         })
         
-        # Aggregate by subject
-        subject_answers = defaultdict(list)
-        for answer in self.answers:
-            subject_answers[answer.subject].append(answer)
+        # Aggregate by subject from the running totals
+        for subject, (attempts, correct, time_sum) in self.subject_totals.items():
+            trends[subject]['avg_correct_rate'] = correct / attempts
+            trends[subject]['avg_time_seconds'] = time_sum / attempts
+            trends[subject]['total_attempts'] = attempts
         
-        for subject, answers in subject_answers.items():
-            if not answers:
-                continue
-            
-            trends[subject]['avg_correct_rate'] = sum(a.is_correct for a in answers) / len(answers)
-            trends[subject]['avg_time_seconds'] = statistics.mean(a.time_spent_seconds for a in answers)
-            trends[subject]['total_attempts'] = len(answers)
-        
-        # Count improvement trends
-        for profile in self.student_profiles.values():
-            for subject, trend in profile.improvement_trend.items():
-                if trend == "improving":
-                    trends[subject]['improving_students'] += 1
-                elif trend == "declining":
-                    trends[subject]['declining_students'] += 1
-                else:
-                    trends[subject]['stable_students'] += 1
+        # Copy the maintained improvement trend tallies
+        for subject, trend_counts in self._trend_counts.items():
+            trends[subject]['improving_students'] = trend_counts["improving"]
+            trends[subject]['declining_students'] = trend_counts["declining"]
+            trends[subject]['stable_students'] = trend_counts["stable"]
         
         return dict(trends)
     
     def analyze_distractor_effectiveness(self, question_id: str) -> Dict[str, Any]:
         """Analyze how effective distractors are for a question"""
-        question_answers = [a for a in self.answers if a.question_id == question_id]
+        # Cached until the next answer to this question invalidates it
+        cache_key = f"distractors:{question_id}"
+        cached = self.performance_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        agg = self.question_aggregates.get(question_id)
         
-        if not question_answers:
+        if agg is None:
             return {}
         
-        # Count selections for each option
-        option_counts = defaultdict(int)
-        for answer in question_answers:
-            option_counts[answer.selected_answer] += 1
+        # Selections for each option are counted as answers arrive
+        option_counts = agg.option_counts
         
-        total_attempts = len(question_answers)
-        correct_answer = question_answers[0].correct_answer
+        total_attempts = agg.total_attempts
+        correct_answer = agg.correct_answer
         
         analysis = {
             'total_attempts': total_attempts,
@@ -386,22 +606,23 @@ class PerformanceTracker:
                 
                 analysis['distractor_effectiveness'][option] = effectiveness
         
+        self._cache_result(cache_key, analysis, question_ids=(question_id,))
         return analysis
     
     def export_analytics(self) -> Dict[str, Any]:
         """Export comprehensive analytics for reporting"""
         return {
             'summary': {
-                'total_answers': len(self.answers),
+                'total_answers': self._total_answers,
                 'unique_questions': len(self.question_performance),
                 'unique_students': len(self.student_profiles),
-                'overall_correct_rate': sum(a.is_correct for a in self.answers) / len(self.answers) if self.answers else 0
+                'overall_correct_rate': self._total_correct / self._total_answers if self._total_answers else 0
             },
             'question_performance': {
-                qid: asdict(perf) for qid, perf in self.question_performance.items()
+                qid: perf.to_dict() for qid, perf in self.question_performance.items()
             },
             'student_profiles': {
-                sid: asdict(profile) for sid, profile in self.student_profiles.items()
+                sid: profile.to_dict() for sid, profile in self.student_profiles.items()
             },
             'subject_trends': self.get_subject_performance_trends(),
             'low_quality_questions': self.get_low_quality_questions(),
@@ -432,7 +653,7 @@ class AdaptiveDifficultyEngine:
             return profile.preferred_difficulty.get(subject, "ORTA")
         
         # Calculate recent performance
-        recent_avg = statistics.mean(recent_scores[-5:])  # Last 5 questions
+        recent_avg = self.tracker.get_recent_average(student_id, subject)  # Last 5 questions
         
         current_difficulty = profile.preferred_difficulty.get(subject, "ORTA")
         
@@ -470,7 +691,7 @@ class AdaptiveDifficultyEngine:
         return should_adjust, current_difficulty, recommended_difficulty
 
 # Global instances
-performance_tracker = PerformanceTracker()
+performance_tracker = PerformanceTracker(spill_path=settings.ANSWER_SPILL_PATH)
 adaptive_engine = AdaptiveDifficultyEngine(performance_tracker)
 
 def get_performance_tracker() -> PerformanceTracker:
@@ -8,15 +8,136 @@ import json
 import re
 import time
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+import logging
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from collections import Counter, OrderedDict, defaultdict
 import hashlib
-import statistics
-from anthropic import Anthropic
+import math
+import sqlite3
+from anthropic import AsyncAnthropic
 import os
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+def _json_dumps_compact(value: Any) -> str:
+    """Compact UTF-8 JSON for embedding in prompts (no indentation, no ASCII escaping)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+_WORD_RE = re.compile(r'\w+')
+_JSON_BLOCK_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# Placeholders marking where per-request text goes in a pre-rendered generation prompt
+_TOPIC_SLOT = '\x00topic\x00'
+_OUTCOME_SLOT = '\x00learning_outcome\x00'
+
+# Common LGS phrases
+_LGS_PHRASES = (
+    'Buna göre', 'Aşağıdakilerden hangisi', 'Bu durumda',
+    'Metne göre', 'Yukarıdaki bilgilere göre', 'Bu bilgilere göre'
+)
+
+_AMBIGUOUS_PHRASES = (
+    'bazen', 'genellikle', 'çoğunlukla', 'belki',
+    'muhtemelen', 'sanırım', 'büyük ihtimalle'
+)
+
+# Turkish dotted/dotless I, so 'İ' and 'I' lowercase the same way as 'i' and 'ı'
+_TURKISH_LOWER = str.maketrans({'İ': 'i', 'I': 'ı'})
+
+# Shorter words must be this long before a longer word extending them counts as the same word plus a suffix
+_MIN_SUFFIX_STEM = 4
+
+def _request_words(text: str) -> Tuple[str, ...]:
+    """Case- and punctuation-normalized words of a request field"""
+    return tuple(_WORD_RE.findall(text.translate(_TURKISH_LOWER).lower()))
+
+def _words_match(a: Tuple[str, ...], b: Tuple[str, ...]) -> bool:
+    """Same words in the same order, allowing only inflectional suffixes on non-numeric words"""
+    for word_a, word_b in zip(a, b):
+        if word_a == word_b:
+            continue
+        short, long = (word_a, word_b) if len(word_a) < len(word_b) else (word_b, word_a)
+        if len(short) < _MIN_SUFFIX_STEM or not long.startswith(short) or any(ch.isdigit() for ch in long):
+            return False
+    return len(a) == len(b)
+
+@lru_cache(maxsize=None)
+def _read_authentic_questions(path: Path, limit: int) -> List[Dict]:
+    """Parse the first `limit` questions of a JSONL file once per process"""
+    if not path.exists():
+        return []
+    with open(path, 'rb') as f:
+        return list(islice((_json_loads(line) for line in f if line.strip()), limit))
+
+class _JsonObjectScanner:
+    """Track brace depth across streamed text, ignoring braces inside JSON strings"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> int:
+        """Offset just past the close of the first top-level object in `text`, or -1 if still open"""
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '{':
+                self.depth += 1
+            elif not self.depth:
+                continue  # Prose before the object
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '}':
+                self.depth -= 1
+                if not self.depth:
+                    return i + 1
+        return -1
+
+async def _stream_json_reply(client: AsyncAnthropic, prompt: str, max_tokens: int) -> str:
+    """Stream a completion and stop reading as soon as its first JSON object closes"""
+    scanner = _JsonObjectScanner()
+    chunks = []
+    async with client.messages.stream(
+        model="claude-3-haiku-20240307",
+        max_tokens=max_tokens,
+        temperature=0.4,
+        messages=[{"role": "user", "content": prompt}]
+    ) as stream:
+        async for text in stream.text_stream:
+            end = scanner.feed(text)
+            if end != -1:
+                chunks.append(text[:end])
+                break  # Leaving the context closes the stream
+            chunks.append(text)
+    return ''.join(chunks).strip()
+
 class DifficultyLevel(str, Enum):
     EASY = "KOLAY"
     MEDIUM = "ORTA"
@@ -52,6 +173,7 @@ class StyleConditioner:
     
     def __init__(self, authentic_questions: List[Dict]):
         self.fingerprints = self._extract_style_fingerprints(authentic_questions)
+        self._style_block = self._build_style_block()
         
     def _extract_style_fingerprints(self, questions: List[Dict]) -> Dict[str, Any]:
         """Extract statistical fingerprint from authentic LGS questions"""
@@ -67,13 +189,7 @@ class StyleConditioner:
         # Extract common phrases and patterns
         stems = [q.get('stem', '') for q in questions]
         
-        # Common LGS phrases
-        lgs_phrases = [
-            'Buna göre', 'Aşağıdakilerden hangisi', 'Bu durumda',
-            'Metne göre', 'Yukarıdaki bilgilere göre', 'Bu bilgilere göre'
-        ]
-        
-        for phrase in lgs_phrases:
+        for phrase in _LGS_PHRASES:
             count = sum(1 for stem in stems if phrase in stem)
             if count > 0:
                 patterns['common_phrases'].append({
@@ -85,19 +201,29 @@ class StyleConditioner:
         # Sentence length statistics
         stem_lengths = [len(stem.split()) for stem in stems if stem]
         if stem_lengths:
+            # Exact integer moments; word counts are ints so no float accumulation is needed
+            stem_lengths.sort()
+            n = len(stem_lengths)
+            total = sum(stem_lengths)
+            squares = sum(x * x for x in stem_lengths)
+            middle = n // 2
             patterns['stem_length_stats'] = {
-                'mean': statistics.mean(stem_lengths),
-                'median': statistics.median(stem_lengths),
-                'std_dev': statistics.stdev(stem_lengths) if len(stem_lengths) > 1 else 0,
-                'min': min(stem_lengths),
-                'max': max(stem_lengths)
+                'mean': total / n,
+                'median': stem_lengths[middle] if n % 2 else (stem_lengths[middle - 1] + stem_lengths[middle]) / 2,
+                'std_dev': math.sqrt((n * squares - total * total) / (n * (n - 1))) if n > 1 else 0,
+                'min': stem_lengths[0],
+                'max': stem_lengths[-1]
             }
         
         return patterns
     
     def condition_prompt(self, base_prompt: str, subject: str) -> str:
         """Add style conditioning to generation prompt"""
-        style_instructions = f"""
+        return base_prompt + "\n" + self._style_block
+    
+    def _build_style_block(self) -> str:
+        """Render the style instructions; fingerprints are corpus-wide, so this is done once"""
+        return f"""
 STYLE GUIDELINES - Follow LGS Exam Style:
 - Use formal Turkish academic language
 - Include common LGS phrases: {', '.join([p['phrase'] for p in self.fingerprints['common_phrases'][:3]])}
@@ -106,7 +232,6 @@ STYLE GUIDELINES - Follow LGS Exam Style:
 - Follow standard LGS question format
 - Ensure options are similar in length and structure
 """
-        return base_prompt + "\n" + style_instructions
 
 class QuestionValidator:
     """Multi-stage validation system with four independent validators"""
@@ -114,6 +239,15 @@ class QuestionValidator:
     def __init__(self, authentic_questions: List[Dict]):
         self.authentic_questions = authentic_questions
         self.similarity_threshold = 0.35
+        # Word -> indices of authentic stems containing it, so similarity only visits stems sharing a word
+        self._authentic_sizes: List[int] = []
+        self._token_postings: Dict[str, List[int]] = defaultdict(list)
+        for q in authentic_questions:
+            tokens = frozenset(q.get('stem', '').lower().split())
+            if tokens:
+                for token in tokens:
+                    self._token_postings[token].append(len(self._authentic_sizes))
+                self._authentic_sizes.append(len(tokens))
     
     async def validate_question(self, question: Dict) -> ValidationResult:
         """Run all validation stages"""
@@ -124,19 +258,33 @@ class QuestionValidator:
         tech_valid, tech_errors = self._validate_technical(question)
         errors.extend(tech_errors)
         
+        # Without a stem or options the remaining stages have nothing to score
+        if not question.get('stem') or not question.get('options'):
+            return ValidationResult(
+                is_valid=False,
+                confidence_score=0.0,
+                validation_errors=errors,
+                quality_metrics=metrics,
+                similarity_score=0.0
+            )
+        
+        # Lowercase and tokenize the stem once for the remaining stages
+        stem_lower = question['stem'].lower()
+        stem_words = stem_lower.split()
+        
         # Stage 2: Ambiguity validation  
-        ambig_score, ambig_errors = self._validate_ambiguity(question)
+        ambig_score, ambig_errors = self._validate_ambiguity(question, stem_lower)
         errors.extend(ambig_errors)
         metrics['ambiguity_score'] = ambig_score
         
         # Stage 3: Similarity validation
-        similarity_score = self._validate_similarity(question)
+        similarity_score = self._validate_similarity(question, frozenset(stem_words))
         if similarity_score > self.similarity_threshold:
             errors.append(f"Too similar to existing question (score: {similarity_score:.3f})")
         metrics['similarity_score'] = similarity_score
         
         # Stage 4: Difficulty validation
-        diff_score, diff_errors = self._validate_difficulty(question)
+        diff_score, diff_errors = self._validate_difficulty(question, len(stem_words))
         errors.extend(diff_errors)
         metrics['difficulty_score'] = diff_score
         
@@ -173,59 +321,70 @@ class QuestionValidator:
         
         return len(errors) == 0, errors
     
-    def _validate_ambiguity(self, question: Dict) -> Tuple[float, List[str]]:
+    def _validate_ambiguity(self, question: Dict, stem_lower: Optional[str] = None) -> Tuple[float, List[str]]:
         """Detect ambiguity in question and options"""
         errors = []
         ambiguity_score = 0.0
         
-        stem = question.get('stem', '')
+        if stem_lower is None:
+            stem_lower = question.get('stem', '').lower()
         
         # Check for ambiguous phrases
-        ambiguous_phrases = [
-            'bazen', 'genellikle', 'çoğunlukla', 'belki', 
-            'muhtemelen', 'sanırım', 'büyük ihtimalle'
-        ]
-        
-        for phrase in ambiguous_phrases:
-            if phrase in stem.lower():
+        for phrase in _AMBIGUOUS_PHRASES:
+            if phrase in stem_lower:
                 ambiguity_score += 0.2
                 errors.append(f"Potentially ambiguous phrase: '{phrase}'")
         
         # Check option clarity
         options = question.get('options', [])
-        option_texts = [opt.get('text', '') for opt in options]
+        option_words = [frozenset(opt.get('text', '').lower().split()) for opt in options]
         
         # Check for overlapping meanings
-        for i, opt1 in enumerate(option_texts):
-            for j, opt2 in enumerate(option_texts[i+1:], i+1):
-                if self._calculate_text_similarity(opt1, opt2) > 0.7:
+        for i, words1 in enumerate(option_words):
+            if not words1:
+                continue
+            for j in range(i + 1, len(option_words)):
+                words2 = option_words[j]
+                shared = len(words1 & words2)
+                if shared and shared / (len(words1) + len(words2) - shared) > 0.7:
                     ambiguity_score += 0.3
                     errors.append(f"Options {i+1} and {j+1} are too similar")
         
         return ambiguity_score, errors
     
-    def _validate_similarity(self, question: Dict) -> float:
+    def _validate_similarity(self, question: Dict, words: Optional[FrozenSet[str]] = None) -> float:
         """Check similarity to existing questions"""
-        stem = question.get('stem', '')
-        max_similarity = 0.0
+        if words is None:
+            words = frozenset(question.get('stem', '').lower().split())
+        if not words:
+            return 0.0
         
-        for existing in self.authentic_questions:
-            existing_stem = existing.get('stem', '')
-            if existing_stem:
-                similarity = self._calculate_text_similarity(stem, existing_stem)
-                max_similarity = max(max_similarity, similarity)
+        # Shared-word count per authentic stem; stems sharing nothing score 0 and are never visited
+        shared_counts = Counter()
+        for word in words:
+            postings = self._token_postings.get(word)
+            if postings:
+                shared_counts.update(postings)
+        
+        size = len(words)
+        sizes = self._authentic_sizes
+        max_similarity = 0.0
+        for index, shared in shared_counts.items():
+            similarity = shared / (size + sizes[index] - shared)
+            if similarity > max_similarity:
+                max_similarity = similarity
         
         return max_similarity
     
-    def _validate_difficulty(self, question: Dict) -> Tuple[float, List[str]]:
+    def _validate_difficulty(self, question: Dict, word_count: Optional[int] = None) -> Tuple[float, List[str]]:
         """Validate difficulty appropriateness"""
         errors = []
         
         target_difficulty = question.get('difficulty_level', 'ORTA')
-        stem = question.get('stem', '')
         
         # Simple heuristics for difficulty
-        word_count = len(stem.split())
+        if word_count is None:
+            word_count = len(question.get('stem', '').split())
         complexity_score = 0.0
         
         # Length-based complexity
@@ -252,10 +411,8 @@ class QuestionValidator:
         if not words1 or not words2:
             return 0.0
         
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union)
+        shared = len(words1 & words2)
+        return shared / (len(words1) + len(words2) - shared)
     
     def _calculate_confidence(self, metrics: Dict, error_count: int) -> float:
         """Calculate overall confidence score"""
@@ -271,7 +428,7 @@ class QuestionValidator:
 class MutationEngine:
     """Self-correcting mutation system"""
     
-    def __init__(self, client: Anthropic):
+    def __init__(self, client: AsyncAnthropic):
         self.client = client
     
     async def mutate_for_difficulty(self, question: Dict, target_difficulty: str) -> Dict:
@@ -284,7 +441,7 @@ Original Question:
 {question.get('stem', '')}
 
 Current Options:
-{json.dumps(question.get('options', []), ensure_ascii=False, indent=2)}
+{_json_dumps_compact(question.get('options', []))}
 
 INSTRUCTIONS:
 - Keep the core learning outcome the same
@@ -310,28 +467,20 @@ Return JSON:
 """
         
         try:
-            response = await asyncio.to_thread(
-                self.client.messages.create,
-                model="claude-3-haiku-20240307",
-                max_tokens=800,
-                temperature=0.4,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            response_text = response.content[0].text.strip()
+            response_text = await _stream_json_reply(self.client, prompt, max_tokens=800)
             return self._extract_json_from_response(response_text)
             
         except Exception as e:
-            print(f"Mutation failed: {e}")
+            logger.warning("Mutation failed: %s", e)
             return question  # Return original if mutation fails
     
     def _extract_json_from_response(self, response_text: str) -> Dict:
         """Extract JSON from LLM response"""
         try:
             # Find JSON block
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            json_match = _JSON_BLOCK_RE.search(response_text)
             if json_match:
-                return json.loads(json_match.group(0))
+                return _json_loads(json_match.group(0))
         except json.JSONDecodeError:
             pass
         
@@ -340,27 +489,45 @@ Return JSON:
 class EnhancedQuestionGenerator:
     """Production-ready question generator with full validation pipeline"""
     
-    def __init__(self):
-        self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    GENERATION_CACHE_SIZE = 10_000
+    GENERATION_CACHE_TTL = 3600  # seconds
+    BATCH_CONCURRENCY = 8  # Max generations a batch runs against the API at once
+    PROMPT_TEMPLATE_CACHE_SIZE = 64
+    
+    def __init__(self, cache_path: Optional[str] = None):
+        self.client = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
         self.authentic_questions = self._load_authentic_questions()
         self.style_conditioner = StyleConditioner(self.authentic_questions)
         self.validator = QuestionValidator(self.authentic_questions)
         self.mutator = MutationEngine(self.client)
-        self.generation_cache = {}
+        # cache_key -> (question, stored_at, near-duplicate bucket), least recently used first
+        self.generation_cache: "OrderedDict[str, Tuple[Dict, float, Tuple]]" = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Near-duplicate bucket -> {cache_key: (topic words, learning outcome words)}
+        self._semantic_index: Dict[Tuple, Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]] = defaultdict(dict)
+        
+        # (subject, question_type, difficulty) -> prompt split around the per-request fields
+        self._prompt_templates: Dict[Tuple[str, QuestionType, DifficultyLevel], Tuple[str, str, str]] = {}
+        
+        self._batch_semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+        
+        # Optional on-disk copy of the generation cache so restarted workers start warm
+        cache_path = cache_path or os.getenv('GENERATION_CACHE_PATH')
+        # cache_key -> row awaiting the next background flush; a newer store replaces an older row
+        self._pending_rows: Dict[str, Tuple] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cache_db = self._open_cache_db(cache_path) if cache_path else None
+        if self._cache_db is not None:
+            self._load_persisted_cache()
         
     def _load_authentic_questions(self) -> List[Dict]:
         """Load authentic LGS questions for fingerprinting"""
         try:
-            questions = []
-            jsonl_path = Path('/app/comprehensive_lgs_2018_2025.jsonl')
-            if jsonl_path.exists():
-                with open(jsonl_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            questions.append(json.loads(line.strip()))
-            return questions[:100]  # Use subset for performance
+            # Shared across generator instances; copied so callers cannot mutate the cached list
+            return list(_read_authentic_questions(Path('/app/comprehensive_lgs_2018_2025.jsonl'), 100))  # Use subset for performance
         except Exception as e:
-            print(f"Warning: Could not load authentic questions: {e}")
+            logger.warning("Could not load authentic questions: %s", e)
             return []
     
     async def generate_question(self, request: GenerationRequest) -> Dict:
@@ -368,27 +535,30 @@ class EnhancedQuestionGenerator:
         
         # Check cache first
         cache_key = self._generate_cache_key(request)
-        if cache_key in self.generation_cache:
-            return self.generation_cache[cache_key]
+        cached = self._lookup_cache(cache_key, request)
+        if cached is not None:
+            return cached
         
         max_iterations = 3
         best_question = None
         best_confidence = 0.0
+        question = None
         
         for iteration in range(max_iterations):
-            print(f"Generation attempt {iteration + 1}/{max_iterations}")
+            logger.debug("Generation attempt %d/%d", iteration + 1, max_iterations)
             
-            # Generate question
-            question = await self._generate_base_question(request)
+            # Generate question, unless the previous attempt was mutated into a new candidate
             if not question:
-                continue
+                question = await self._generate_base_question(request)
+                if not question:
+                    continue
             
             # Validate
             validation = await self.validator.validate_question(question)
             
             if validation.is_valid:
                 # Cache successful generation
-                self.generation_cache[cache_key] = question
+                self._store_cache(cache_key, request, question)
                 return question
             
             # Track best attempt
@@ -397,31 +567,47 @@ class EnhancedQuestionGenerator:
                 best_confidence = validation.confidence_score
             
             # Try mutation if validation failed
+            mutated = None
             if iteration < max_iterations - 1:
-                print(f"Validation failed, attempting mutation...")
-                print(f"Errors: {validation.validation_errors}")
+                logger.debug("Validation failed, attempting mutation. Errors: %s", validation.validation_errors)
                 
                 # Mutate for most critical error
                 if any("difficulty" in error.lower() for error in validation.validation_errors):
-                    question = await self.mutator.mutate_for_difficulty(
+                    mutated = await self.mutator.mutate_for_difficulty(
                         question, request.difficulty.value
                     )
+            
+            # Validate the mutation next instead of paying for a fresh generation
+            question = self._apply_mutation(question, mutated) if mutated and mutated is not question else None
         
         # Return best attempt if all iterations failed
-        print(f"Warning: All validation attempts failed, returning best attempt (confidence: {best_confidence:.3f})")
+        logger.warning("All validation attempts failed, returning best attempt (confidence: %.3f)", best_confidence)
         return best_question or {'error': 'Generation failed'}
     
-    async def _generate_base_question(self, request: GenerationRequest) -> Dict:
-        """Generate base question with style conditioning"""
+    @staticmethod
+    def _apply_mutation(question: Dict, mutated: Dict) -> Dict:
+        """Overlay a mutation on the original, keeping its metadata and re-deriving the answer key"""
+        merged = {**question, **mutated}
+        correct_key = next((opt.get('key') for opt in merged.get('options', []) if opt.get('is_correct')), None)
+        if correct_key:
+            merged['correct_answer'] = correct_key
+        return merged
+    
+    def _prompt_template(self, subject: str, question_type: QuestionType, difficulty: DifficultyLevel) -> Tuple[str, str, str]:
+        """Style-conditioned prompt split around the topic and learning outcome, rendered once per combination"""
+        key = (subject, question_type, difficulty)
+        parts = self._prompt_templates.get(key)
+        if parts is not None:
+            return parts
         
         base_prompt = f"""
-Generate a high-quality {request.question_type.value} question for LGS exam.
+Generate a high-quality {question_type.value} question for LGS exam.
 
 REQUIREMENTS:
-- Subject: {request.subject}
-- Topic: {request.topic}  
-- Learning Outcome: {request.learning_outcome}
-- Difficulty: {request.difficulty.value}
+- Subject: {subject}
+- Topic: {_TOPIC_SLOT}  
+- Learning Outcome: {_OUTCOME_SLOT}
+- Difficulty: {difficulty.value}
 - Must follow official LGS format and standards
 - Exactly 4 multiple choice options (A, B, C, D)
 - Exactly 1 correct answer
@@ -439,25 +625,30 @@ Return valid JSON only:
   ],
   "correct_answer": "B",
   "explanation": "Detailed solution explanation",
-  "subject": "{request.subject}",
-  "difficulty_level": "{request.difficulty.value}",
+  "subject": "{subject}",
+  "difficulty_level": "{difficulty.value}",
   "confidence": 85
 }}
 """
         
-        # Apply style conditioning
-        conditioned_prompt = self.style_conditioner.condition_prompt(base_prompt, request.subject)
+        conditioned_prompt = self.style_conditioner.condition_prompt(base_prompt, subject)
+        head, rest = conditioned_prompt.split(_TOPIC_SLOT)
+        middle, tail = rest.split(_OUTCOME_SLOT)
+        
+        if len(self._prompt_templates) >= self.PROMPT_TEMPLATE_CACHE_SIZE:
+            del self._prompt_templates[next(iter(self._prompt_templates))]
+        parts = self._prompt_templates[key] = (head, middle, tail)
+        return parts
+    
+    async def _generate_base_question(self, request: GenerationRequest) -> Dict:
+        """Generate base question with style conditioning"""
+        
+        # Only the topic and learning outcome vary within a (subject, type, difficulty) combination
+        head, middle, tail = self._prompt_template(request.subject, request.question_type, request.difficulty)
+        conditioned_prompt = ''.join((head, request.topic, middle, request.learning_outcome, tail))
         
         try:
-            response = await asyncio.to_thread(
-                self.client.messages.create,
-                model="claude-3-haiku-20240307",
-                max_tokens=1200,
-                temperature=0.4,
-                messages=[{"role": "user", "content": conditioned_prompt}]
-            )
-            
-            response_text = response.content[0].text.strip()
+            response_text = await _stream_json_reply(self.client, conditioned_prompt, max_tokens=1200)
             question = self._extract_json_from_response(response_text)
             
             # Add metadata
@@ -472,24 +663,24 @@ Return valid JSON only:
             return question
             
         except Exception as e:
-            print(f"Base generation failed: {e}")
+            logger.warning("Base generation failed: %s", e)
             return None
     
     def _extract_json_from_response(self, response_text: str) -> Dict:
         """Enhanced JSON extraction with multiple fallback methods"""
         
         # Method 1: Find JSON block
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        json_match = _JSON_BLOCK_RE.search(response_text)
         if json_match:
             try:
-                return json.loads(json_match.group(0))
+                return _json_loads(json_match.group(0))
             except json.JSONDecodeError:
                 pass
         
         # Method 2: Try removing markdown formatting
         cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
         try:
-            return json.loads(cleaned_text)
+            return _json_loads(cleaned_text)
         except json.JSONDecodeError:
             pass
         
@@ -498,7 +689,7 @@ Return valid JSON only:
         end = response_text.rfind('}')
         if start != -1 and end != -1 and end > start:
             try:
-                return json.loads(response_text[start:end+1])
+                return _json_loads(response_text[start:end+1])
             except json.JSONDecodeError:
                 pass
         
@@ -506,18 +697,187 @@ Return valid JSON only:
     
     def _generate_cache_key(self, request: GenerationRequest) -> str:
         """Generate cache key for request"""
-        key_data = f"{request.subject}_{request.topic}_{request.learning_outcome}_{request.difficulty}"
-        return hashlib.md5(key_data.encode()).hexdigest()
+        key_data = f"{request.subject}_{request.topic}_{request.learning_outcome}_{request.difficulty}_{request.question_type.value}"
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_128_hexdigest(key_data.encode())
+        return hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _semantic_key(subject: str, difficulty: str, question_type: str,
+                      topic: str, learning_outcome: str) -> Tuple[Tuple, Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Bucket and normalized words used to match requests that differ only in casing, punctuation or suffixes"""
+        topic_words = _request_words(topic)
+        outcome_words = _request_words(learning_outcome)
+        # Numeric tokens (LO codes such as M.8.1.1.1) must match exactly, so they are part of the bucket
+        outcome_codes = tuple(word for word in outcome_words if any(ch.isdigit() for ch in word))
+        bucket = (subject, difficulty, question_type, len(topic_words), len(outcome_words), outcome_codes)
+        return bucket, (topic_words, outcome_words)
+    
+    def _request_semantic_key(self, request: GenerationRequest) -> Tuple[Tuple, Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Near-duplicate bucket and words for a generation request"""
+        return self._semantic_key(request.subject, request.difficulty.value, request.question_type.value,
+                                  request.topic, request.learning_outcome)
+    
+    @staticmethod
+    def _open_cache_db(path: str) -> Optional[sqlite3.Connection]:
+        """Open (or create) the SQLite file backing the generation cache"""
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')  # Other workers can read while one writes
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS generation_cache ('
+                'cache_key TEXT PRIMARY KEY, subject TEXT NOT NULL, difficulty TEXT NOT NULL, '
+                'question_type TEXT NOT NULL, topic TEXT NOT NULL, learning_outcome TEXT NOT NULL, question TEXT NOT NULL, '
+                'stored_at REAL NOT NULL)'
+            )
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Generation cache persistence disabled: %s", e)
+            return None
+    
+    def _schedule_flush(self):
+        """Start a background flush of pending rows unless one is already running"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return  # The running flush picks up rows queued while it writes
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_pending_rows())
+        except RuntimeError:
+            pass  # No event loop; rows stay queued until a store happens on one
+    
+    async def flush_persisted_cache(self):
+        """Wait until every queued row has been written to the on-disk cache"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self._flush_pending_rows()
+    
+    async def _flush_pending_rows(self):
+        """Write queued rows off the event loop, one transaction per batch"""
+        while self._pending_rows:
+            rows, self._pending_rows = list(self._pending_rows.values()), {}
+            await asyncio.to_thread(self._write_rows, rows, time.time() - self.GENERATION_CACHE_TTL)
+    
+    def _write_rows(self, rows: List[Tuple], expired_before: float):
+        """Upsert a batch of rows and sweep expired ones; failures only cost persistence"""
+        try:
+            with self._cache_db:
+                self._cache_db.executemany('INSERT OR REPLACE INTO generation_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._cache_db.execute('DELETE FROM generation_cache WHERE stored_at <= ?', (expired_before,))
+        except sqlite3.Error as e:
+            logger.warning("Generation cache write failed: %s", e)
+    
+    def _load_persisted_cache(self):
+        """Warm the in-memory cache with the newest unexpired questions on disk"""
+        now = time.time()
+        try:
+            self._cache_db.execute('DELETE FROM generation_cache WHERE stored_at <= ?', (now - self.GENERATION_CACHE_TTL,))
+            self._cache_db.commit()
+            rows = self._cache_db.execute(
+                'SELECT cache_key, subject, difficulty, question_type, topic, learning_outcome, question, stored_at '
+                'FROM generation_cache ORDER BY stored_at DESC LIMIT ?',
+                (self.GENERATION_CACHE_SIZE,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Could not load generation cache: %s", e)
+            return
+        
+        # Wall-clock ages on disk, monotonic timestamps in memory
+        clock_offset = time.monotonic() - now
+        for cache_key, subject, difficulty, question_type, topic, learning_outcome, question, stored_at in reversed(rows):
+            bucket, words = self._semantic_key(subject, difficulty, question_type, topic, learning_outcome)
+            self.generation_cache[cache_key] = (_json_loads(question), stored_at + clock_offset, bucket)
+            self._semantic_index[bucket][cache_key] = words
+    
+    def _cached_question(self, cache_key: str) -> Optional[Dict]:
+        """Return a live cache entry and mark it recently used, dropping it if expired"""
+        entry = self.generation_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        question, stored_at, _ = entry
+        if time.monotonic() - stored_at >= self.GENERATION_CACHE_TTL:
+            self._evict_cache_entry(cache_key)
+            return None
+        
+        self.generation_cache.move_to_end(cache_key)
+        return question
+    
+    def _lookup_cache(self, cache_key: str, request: GenerationRequest) -> Optional[Dict]:
+        """Exact key match first, then a request differing only in casing, punctuation or suffixes"""
+        question = self._cached_question(cache_key)
+        
+        if question is None:
+            bucket, (topic_words, outcome_words) = self._request_semantic_key(request)
+            candidates = self._semantic_index.get(bucket)
+            if candidates:
+                for key, (cached_topic, cached_outcome) in candidates.items():
+                    if _words_match(outcome_words, cached_outcome) and _words_match(topic_words, cached_topic):
+                        question = self._cached_question(key)
+                        break
+        
+        if question is None:
+            self._cache_misses += 1
+        else:
+            self._cache_hits += 1
+        return question
+    
+    def _store_cache(self, cache_key: str, request: GenerationRequest, question: Dict):
+        """Cache a validated question under its exact key and its near-duplicate index"""
+        if cache_key in self.generation_cache:
+            self.generation_cache.move_to_end(cache_key)
+        else:
+            while len(self.generation_cache) >= self.GENERATION_CACHE_SIZE:
+                self._evict_cache_entry(next(iter(self.generation_cache)))
+        
+        bucket, words = self._request_semantic_key(request)
+        self.generation_cache[cache_key] = (question, time.monotonic(), bucket)
+        self._semantic_index[bucket][cache_key] = words
+        
+        if self._cache_db is not None:
+            self._pending_rows[cache_key] = (
+                cache_key, request.subject, request.difficulty.value, request.question_type.value,
+                request.topic, request.learning_outcome, _json_dumps_compact(question), time.time()
+            )
+            self._schedule_flush()
+    
+    def _evict_cache_entry(self, cache_key: str):
+        """Remove a cached question from both the LRU map and the near-duplicate index"""
+        # The on-disk row is left for the flush's TTL sweep; loading keeps only the newest rows
+        _, _, bucket = self.generation_cache.pop(cache_key)
+        keys = self._semantic_index.get(bucket)
+        if keys is not None:
+            keys.pop(cache_key, None)
+            if not keys:
+                del self._semantic_index[bucket]
     
     async def generate_question_batch(self, requests: List[GenerationRequest]) -> List[Dict]:
         """Generate multiple questions efficiently"""
-        tasks = [self.generate_question(request) for request in requests]
-        return await asyncio.gather(*tasks)
+        async def generate_bounded(request: GenerationRequest) -> Dict:
+            async with self._batch_semaphore:
+                return await self.generate_question(request)
+        
+        # Identical requests in a batch share one generation
+        unique_requests: Dict[str, GenerationRequest] = {}
+        cache_keys = []
+        for request in requests:
+            cache_key = self._generate_cache_key(request)
+            cache_keys.append(cache_key)
+            unique_requests.setdefault(cache_key, request)
+        
+        questions = await asyncio.gather(*(generate_bounded(request) for request in unique_requests.values()))
+        by_key = dict(zip(unique_requests, questions))
+        return [by_key[cache_key] for cache_key in cache_keys]
     
     def get_cache_stats(self) -> Dict:
         """Get generation cache statistics"""
+        lookups = self._cache_hits + self._cache_misses
         return {
             'cache_size': len(self.generation_cache),
+            'max_size': self.GENERATION_CACHE_SIZE,
+            'ttl_seconds': self.GENERATION_CACHE_TTL,
             'cache_keys': list(self.generation_cache.keys())[:10],  # Sample
-            'hit_rate': 0.0  # TODO: Implement hit tracking
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'hit_rate': self._cache_hits / lookups if lookups else 0.0
         }
\ No newline at end of file
@@ -6,6 +6,7 @@ Tracks every question, identifies weaknesses, and generates actionable insights
 
 import json
 import time
+import bisect
 import statistics
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
@@ -20,13 +21,16 @@ class AlertType(str, Enum):
     ACTIVITY_DROP = "activity_drop"
     TREND_DECLINE = "trend_decline"
 
+# Alert severity ranking used for dashboard ordering (higher is more urgent)
+SEVERITY_RANK = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+
 class PerformanceTrend(str, Enum):
     IMPROVING = "improving"
     STABLE = "stable"
     DECLINING = "declining"
     CRITICAL = "critical"
 
-@dataclass
+@dataclass(slots=True)
 class QuestionSubmission:
     """Individual question submission record"""
     submission_id: str
@@ -44,6 +48,27 @@ class QuestionSubmission:
     timestamp: float
     session_id: str
     teacher_id: str
+    
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any], class_id: str, teacher_id: str) -> "QuestionSubmission":
+        """Build a submission from an API payload, passing fields positionally"""
+        return cls(
+            data["submission_id"],
+            data["student_id"],
+            data["question_id"],
+            class_id,
+            data["subject"],
+            data["topic"],
+            data["learning_outcome"],
+            data["difficulty"],
+            data["selected_answer"],
+            data["correct_answer"],
+            data["is_correct"],
+            data["time_spent_seconds"],
+            data.get("timestamp", time.time()),
+            data["session_id"],
+            teacher_id
+        )
 
 @dataclass
 class StudentTopicPerformance:
@@ -74,7 +99,7 @@ class LearningOutcomeAnalysis:
     common_mistakes: List[str]
     recommended_interventions: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class ClassAlert:
     """Alert for teachers about student performance issues"""
     alert_id: str
@@ -90,7 +115,7 @@ class ClassAlert:
     is_active: bool
     recommended_actions: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class VideoRecommendation:
     """Video recommendation for struggling students"""
     video_id: str
@@ -113,12 +138,31 @@ class TeacherAnalyticsEngine:
         self.subject_assignments: Dict[str, List[str]] = {}  # teacher_id -> [subjects]
         self.homeroom_teachers: Dict[str, str] = {}  # class_id -> teacher_id
         self.active_alerts: List[ClassAlert] = []
+        # Active alerts ordered by (-severity rank, -created_at, insertion seq)
+        self._alerts_by_priority: List[Tuple[int, float, int, ClassAlert]] = []
+        self._alert_seq = 0
         self.video_library: List[VideoRecommendation] = []
         
         # Performance caches for real-time updates
         self.student_performance_cache: Dict[str, Dict] = {}
         self.topic_performance_cache: Dict[str, Dict] = {}
         self.lo_analysis_cache: Dict[str, LearningOutcomeAnalysis] = {}
+        
+        # Data versions consulted by the short-lived dashboard view caches
+        self._roster_version = 0
+        self._class_versions: Dict[str, int] = defaultdict(int)
+        self._student_versions: Dict[str, int] = defaultdict(int)
+        self._lo_versions: Dict[Tuple[str, str], int] = defaultdict(int)  # (subject, lo) -> version
+        
+        # Indexes maintained on insert so the per-submission checks never scan all submissions
+        self._lo_counts: Dict[Tuple[str, str], List[int]] = {}  # (student, lo) -> [correct, total]
+        self._lo_submissions: Dict[Tuple[str, str], List[QuestionSubmission]] = defaultdict(list)
+        # Trailing error streak per (student, lo); None once submissions arrived out of timestamp order
+        self._lo_error_streaks: Dict[Tuple[str, str], Optional[int]] = {}
+        self._topic_submissions: Dict[Tuple[str, str, str], List[QuestionSubmission]] = defaultdict(list)  # (student, subject, topic)
+        self._subject_submissions: Dict[Tuple[str, str], List[QuestionSubmission]] = defaultdict(list)  # (student, subject)
+        # (class, subject, topic) -> {student: [correct, total]}
+        self._class_topic_counts: Dict[Tuple[str, str, str], Dict[str, List[int]]] = defaultdict(dict)
     
     def register_teacher_access(self, teacher_id: str, class_ids: List[str], 
                                subjects: List[str], is_homeroom: bool = False):
@@ -130,15 +174,20 @@ class TeacherAnalyticsEngine:
                 self.homeroom_teachers[class_id] = teacher_id
         
         self.subject_assignments[teacher_id] = subjects
+        self._roster_version += 1
     
     def add_students_to_class(self, teacher_id: str, class_id: str, student_ids: List[str]):
         """Add students to a teacher's class"""
         if teacher_id in self.class_rosters and class_id in self.class_rosters[teacher_id]:
             self.class_rosters[teacher_id][class_id].extend(student_ids)
+            self._roster_version += 1
     
     def record_question_submission(self, submission: QuestionSubmission):
         """Record and analyze a question submission in real-time"""
         self.submissions.append(submission)
+        self._index_submission(submission)
+        self._bump_view_versions(submission.class_id, submission.student_id,
+                                 (submission.subject, submission.learning_outcome))
         
         # Perform instant analysis
         self._instant_analysis(submission)
@@ -151,6 +200,46 @@ class TeacherAnalyticsEngine:
         
         print(f"📝 Recorded submission: Student {submission.student_id} - {submission.subject}/{submission.topic}")
     
+    def _index_submission(self, submission: QuestionSubmission):
+        """Add a submission to the per-student and per-class lookup indexes"""
+        student_id = submission.student_id
+        correct = 1 if submission.is_correct else 0
+        
+        lo_key = (student_id, submission.learning_outcome)
+        counts = self._lo_counts.get(lo_key)
+        if counts is None:
+            self._lo_counts[lo_key] = [correct, 1]
+        else:
+            counts[0] += correct
+            counts[1] += 1
+        
+        lo_history = self._lo_submissions[lo_key]
+        streak = self._lo_error_streaks.get(lo_key, 0)
+        if streak is not None and (not lo_history or submission.timestamp > lo_history[-1].timestamp):
+            self._lo_error_streaks[lo_key] = 0 if correct else streak + 1
+        else:
+            self._lo_error_streaks[lo_key] = None
+        lo_history.append(submission)
+        
+        self._topic_submissions[(student_id, submission.subject, submission.topic)].append(submission)
+        self._subject_submissions[(student_id, submission.subject)].append(submission)
+        
+        student_counts = self._class_topic_counts[(submission.class_id, submission.subject, submission.topic)]
+        counts = student_counts.get(student_id)
+        if counts is None:
+            student_counts[student_id] = [correct, 1]
+        else:
+            counts[0] += correct
+            counts[1] += 1
+    
+    def _bump_view_versions(self, class_id: str, student_id: str,
+                            lo_key: Optional[Tuple[str, str]] = None):
+        """Invalidate cached dashboard views that depend on this class/student"""
+        self._class_versions[class_id] += 1
+        self._student_versions[student_id] += 1
+        if lo_key is not None:
+            self._lo_versions[lo_key] += 1
+    
     def _instant_analysis(self, submission: QuestionSubmission):
         """Perform instant analysis when a question is submitted"""
         student_id = submission.student_id
@@ -263,8 +352,40 @@ class TeacherAnalyticsEngine:
         )
         
         self.active_alerts.append(alert)
+        self._alert_seq += 1
+        bisect.insort(self._alerts_by_priority, self._alert_priority_key(alert, self._alert_seq) + (alert,))
         print(f"🚨 ALERT: {alert.message}")
     
+    @staticmethod
+    def _alert_priority_key(alert: ClassAlert, seq: int) -> Tuple[int, float, int]:
+        """Sort key placing the most severe, most recent alerts first"""
+        return (-SEVERITY_RANK.get(alert.severity, 0), -alert.created_at, seq)
+    
+    def get_alerts_by_priority(self, severity: Optional[str] = None) -> List[ClassAlert]:
+        """Active alerts, most severe and most recent first, optionally for one severity"""
+        entries = self._alerts_by_priority
+        if severity is None:
+            return [entry[3] for entry in entries]
+        
+        # Alerts of one severity form a contiguous block of the ordering
+        rank = SEVERITY_RANK.get(severity, 0)
+        start = bisect.bisect_left(entries, (-rank,))
+        end = bisect.bisect_left(entries, (-rank + 1,))
+        return [entry[3] for entry in entries[start:end] if entry[3].severity == severity]
+    
+    def resolve_alert(self, alert: ClassAlert):
+        """Mark an alert as resolved and drop it from the priority ordering"""
+        alert.is_active = False
+        entries = self._alerts_by_priority
+        prefix = self._alert_priority_key(alert, 0)[:2]
+        index = bisect.bisect_left(entries, prefix)
+        while index < len(entries) and entries[index][:2] == prefix:
+            if entries[index][3] is alert:
+                del entries[index]
+                break
+            index += 1
+        self._bump_view_versions(alert.class_id, alert.student_id)
+    
     def _generate_alert_recommendations(self, alert_type: AlertType, 
                                       submission: QuestionSubmission) -> List[str]:
         """Generate recommended actions for alerts"""
@@ -589,10 +710,7 @@ class TeacherAnalyticsEngine:
     
     def _calculate_topic_performance(self, student_id: str, topic: str, subject: str) -> StudentTopicPerformance:
         """Calculate student's performance on a specific topic"""
-        topic_submissions = [s for s in self.submissions 
-                           if s.student_id == student_id 
-                           and s.topic == topic 
-                           and s.subject == subject]
+        topic_submissions = self._topic_submissions.get((student_id, subject, topic), [])
         
         if not topic_submissions:
             return StudentTopicPerformance(
@@ -643,41 +761,26 @@ class TeacherAnalyticsEngine:
     
     def _calculate_lo_performance(self, student_id: str, learning_outcome: str) -> float:
         """Calculate student's accuracy on a specific learning outcome"""
-        lo_submissions = [s for s in self.submissions 
-                         if s.student_id == student_id 
-                         and s.learning_outcome == learning_outcome]
-        
-        if not lo_submissions:
+        counts = self._lo_counts.get((student_id, learning_outcome))
+        if counts is None:
             return 0.0
         
-        return sum(s.is_correct for s in lo_submissions) / len(lo_submissions)
+        return counts[0] / counts[1]
     
     def _get_class_topic_performance(self, class_id: str, topic: str, subject: str) -> Dict[str, float]:
         """Get topic performance for all students in class"""
-        class_submissions = [s for s in self.submissions 
-                           if s.class_id == class_id 
-                           and s.topic == topic 
-                           and s.subject == subject]
-        
-        student_performances = {}
-        for student_id in set(s.student_id for s in class_submissions):
-            student_topic_submissions = [s for s in class_submissions if s.student_id == student_id]
-            accuracy = sum(s.is_correct for s in student_topic_submissions) / len(student_topic_submissions)
-            student_performances[student_id] = accuracy
-        
-        return student_performances
+        student_counts = self._class_topic_counts.get((class_id, subject, topic), {})
+        return {student_id: correct / total for student_id, (correct, total) in student_counts.items()}
     
     def _count_consecutive_lo_errors(self, student_id: str, learning_outcome: str) -> int:
         """Count consecutive errors on the same LO"""
-        lo_submissions = [s for s in self.submissions 
-                         if s.student_id == student_id 
-                         and s.learning_outcome == learning_outcome]
-        
-        if not lo_submissions:
-            return 0
+        lo_key = (student_id, learning_outcome)
+        streak = self._lo_error_streaks.get(lo_key, 0)
+        if streak is not None:
+            return streak
         
-        # Sort by timestamp (most recent first)
-        lo_submissions.sort(key=lambda x: x.timestamp, reverse=True)
+        # Submissions arrived out of timestamp order; sort this student's LO history (most recent first)
+        lo_submissions = sorted(self._lo_submissions[lo_key], key=lambda x: x.timestamp, reverse=True)
         
         consecutive_errors = 0
         for submission in lo_submissions:
@@ -690,19 +793,16 @@ class TeacherAnalyticsEngine:
     
     def _get_lo_attempt_count(self, student_id: str, learning_outcome: str) -> int:
         """Get total attempt count for a learning outcome"""
-        return len([s for s in self.submissions 
-                   if s.student_id == student_id 
-                   and s.learning_outcome == learning_outcome])
+        counts = self._lo_counts.get((student_id, learning_outcome))
+        return counts[1] if counts is not None else 0
     
     def _calculate_7day_trend_decline(self, student_id: str, subject: str) -> float:
         """Calculate performance decline over last 7 days"""
         now = time.time()
         week_ago = now - (7 * 24 * 60 * 60)
         
-        recent_submissions = [s for s in self.submissions 
-                            if s.student_id == student_id 
-                            and s.subject == subject 
-                            and s.timestamp >= week_ago]
+        recent_submissions = [s for s in self._subject_submissions.get((student_id, subject), ())
+                              if s.timestamp >= week_ago]
         
         if len(recent_submissions) < 10:  # Need sufficient data
             return 0.0
@@ -720,21 +820,46 @@ class TeacherAnalyticsEngine:
     def _calculate_topic_struggles(self, submissions: List[QuestionSubmission]) -> List[Dict[str, Any]]:
         """Find topics with highest struggle rates"""
         topic_stats = defaultdict(lambda: {'correct': 0, 'total': 0})
-        
+
         for submission in submissions:
-            topic_key = f"{submission.subject}:{submission.topic}"
+            topic_key = (submission.subject, submission.topic)
             topic_stats[topic_key]['total'] += 1
             if submission.is_correct:
                 topic_stats[topic_key]['correct'] += 1
-        
-        # Calculate struggle rates and sort
+
+        return self._rank_topic_struggles(topic_stats)
+
+    def _calculate_subject_performance(self, submissions: List[QuestionSubmission],
+                                       top_n: int = 3) -> Dict[str, Dict[str, Any]]:
+        """Calculate per-subject accuracy and struggling topics in a single pass"""
+        subject_topic_stats = defaultdict(lambda: defaultdict(lambda: {'correct': 0, 'total': 0}))
+
+        for submission in submissions:
+            stats = subject_topic_stats[submission.subject][(submission.subject, submission.topic)]
+            stats['total'] += 1
+            if submission.is_correct:
+                stats['correct'] += 1
+
+        subject_performance = {}
+        for subject, topic_stats in subject_topic_stats.items():
+            total = sum(stats['total'] for stats in topic_stats.values())
+            correct = sum(stats['correct'] for stats in topic_stats.values())
+            subject_performance[subject] = {
+                'accuracy': correct / total,
+                'total_questions': total,
+                'improvement_areas': self._rank_topic_struggles(topic_stats)[:top_n]
+            }
+
+        return subject_performance
+
+    def _rank_topic_struggles(self, topic_stats: Dict[Tuple[str, str], Dict[str, int]]) -> List[Dict[str, Any]]:
+        """Rank (subject, topic) tallies by struggle rate"""
         struggles = []
-        for topic_key, stats in topic_stats.items():
+        for (subject, topic), stats in topic_stats.items():
             if stats['total'] >= 5:  # Minimum sample size
                 accuracy = stats['correct'] / stats['total']
                 struggle_rate = 1 - accuracy
-                subject, topic = topic_key.split(':', 1)
-                
+
                 struggles.append({
                     'subject': subject,
                     'topic': topic,
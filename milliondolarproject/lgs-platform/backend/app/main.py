@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.caching import close_cache_manager
 from app.core.config import settings
+from app.core.performance import get_performance_tracker
 from app.api.v1 import auth, student, teacher, admin, curriculum, questions, exams, generation, teachers
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -25,6 +27,13 @@ app.include_router(exams.router, prefix=f"{settings.API_V1_STR}/exams", tags=["e
 app.include_router(generation.router, prefix=f"{settings.API_V1_STR}/generation", tags=["generation"])
 
 
+@app.on_event("shutdown")
+async def flush_pending_writes():
+    await get_performance_tracker().flush_spill()
+    await generation.generator.flush_persisted_cache()
+    await close_cache_manager()
+
+
 @app.get("/")
 def health_check():
     return {"status": "ok"}
@@ -87,6 +87,14 @@ class AlertResponse(BaseModel):
     created_at: float
     recommended_actions: List[str]
 
+class AlertListResponse(BaseModel):
+    """Response model for the active alerts listing"""
+    status: str
+    alerts: List[AlertResponse]
+    total_count: int
+    critical_count: int
+    high_count: int
+
 class SubmissionRequest(BaseModel):
     """Request model for recording submissions"""
     submission_id: str
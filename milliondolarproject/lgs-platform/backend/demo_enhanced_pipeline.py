@@ -111,6 +111,7 @@ async def demo_enhanced_pipeline():
         generation_request.learning_outcome,
         generation_request.difficulty.value
     )
+    await cache_manager.flush_writes()
     print("   ✓ Question cached successfully")
     
     # Retrieve from cache
@@ -0,0 +1,295 @@
+"""
+Question cache tests.
+Tests the payload codec, the sharded Redis cache against fakeredis, and shared
+in-flight generation in the question cache manager.
+"""
+import asyncio
+import zlib
+
+import fakeredis
+import pytest
+
+from app.core import caching
+from app.core.caching import CacheConfig, InMemoryCache, QuestionCacheManager, RedisCache
+
+SHARDS = [("localhost", 6379), ("cache-b", 6380)]
+
+
+@pytest.fixture
+def manager() -> QuestionCacheManager:
+    """Provide a cache manager backed by the in-memory cache."""
+    manager = QuestionCacheManager()
+    manager.cache = InMemoryCache()
+    return manager
+
+
+@pytest.fixture
+def fake_redis(monkeypatch) -> dict:
+    """Route RedisCache connections to one in-process fakeredis server per endpoint."""
+    servers = {}
+
+    def connect(host, port, **kwargs):
+        server = servers.setdefault((host, port), fakeredis.FakeServer())
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs)
+
+    monkeypatch.setattr(caching, "AsyncRedis", connect)
+    return servers
+
+
+async def _sharded_cache() -> RedisCache:
+    cache = RedisCache(CacheConfig(shard_hosts=SHARDS[1:], access_flush_interval=3600))
+    assert await cache.connect()
+    return cache
+
+
+def _owners(cache: RedisCache, keys) -> dict:
+    owners = {}
+    for key in keys:
+        owners.setdefault(cache._shard_index(key), []).append(key)
+    return owners
+
+
+class TestPayloadCodec:
+    """Test the tagged binary codec around the compression threshold."""
+
+    @pytest.mark.parametrize("size", [0, caching.COMPRESS_MIN_BYTES - 1])
+    def test_small_payloads_are_stored_raw(self, size: int):
+        """Test that payloads under the threshold keep the raw tag and round-trip."""
+        raw = b"x" * size
+        blob = caching._pack(raw)
+
+        assert blob[:1] == caching._CODEC_RAW
+        assert caching._unpack(blob) == raw
+
+    @pytest.mark.parametrize("size", [caching.COMPRESS_MIN_BYTES, 10_000])
+    def test_large_payloads_use_zlib_without_zstd(self, monkeypatch, size: int):
+        """Test that payloads at or over the threshold are zlib-compressed when zstd is missing."""
+        monkeypatch.setattr(caching, "ZSTD_AVAILABLE", False)
+        raw = b"y" * size
+        blob = caching._pack(raw)
+
+        assert blob[:1] == caching._CODEC_ZLIB
+        assert len(blob) < len(raw)
+        assert zlib.decompress(blob[1:]) == raw
+        assert caching._unpack(blob) == raw
+
+    @pytest.mark.skipif(not caching.ZSTD_AVAILABLE, reason="zstandard not installed")
+    @pytest.mark.parametrize("size", [caching.COMPRESS_MIN_BYTES, 10_000])
+    def test_large_payloads_use_zstd(self, size: int):
+        """Test that zstd is preferred when available and its blobs round-trip."""
+        raw = b"z" * size
+        blob = caching._pack(raw)
+
+        assert blob[:1] == caching._CODEC_ZSTD
+        assert caching._unpack(blob) == raw
+
+    @pytest.mark.parametrize("value", [
+        {"stem": "Kısa soru"},
+        {"stem": "Uzun soru " * 100, "options": [{"key": "A", "is_correct": True}]},
+        "düz metin",
+        "ş" * 3000,
+    ])
+    def test_values_round_trip(self, value):
+        """Test that dicts and plain strings decode to the stored value, on and off the event loop."""
+        blob = caching._pack(caching._dumps(value))
+
+        assert caching._decode(blob) == value
+        assert asyncio.run(caching._decode_async(blob)) == value
+
+
+class TestShardedRedisCache:
+    """Test RedisCache hash entries and hash-ring sharding against fakeredis."""
+
+    def test_entries_live_on_their_owning_shard(self, fake_redis: dict):
+        """Test set/get/exists/delete across two shards, with each key stored on one shard only."""
+        keys = [f"question:{i}" for i in range(40)]
+
+        async def scenario():
+            cache = await _sharded_cache()
+            for i, key in enumerate(keys):
+                assert await cache.set(key, {"stem": f"Soru {i}", "confidence": 0.9}, ttl=120)
+
+            owners = _owners(cache, keys)
+            placement = {}
+            for index, owned in owners.items():
+                for key in owned:
+                    other = cache.shards[1 - index]
+                    placement[key] = (await cache.shards[index].exists(key), await other.exists(key))
+
+            values = [await cache.get(key) for key in keys]
+            entry = await cache.shards[cache._shard_index(keys[0])].hgetall(keys[0])
+            ttl = await cache.shards[cache._shard_index(keys[0])].ttl(keys[0])
+            exists_before = await cache.exists(keys[0])
+            deleted = await cache.delete(keys[0])
+            exists_after = await cache.exists(keys[0])
+            remaining = await cache.get(keys[1])
+            await cache.close()
+            return owners, placement, values, entry, ttl, exists_before, deleted, exists_after, remaining
+
+        owners, placement, values, entry, ttl, exists_before, deleted, exists_after, remaining = asyncio.run(scenario())
+
+        assert set(owners) == {0, 1}
+        assert all(found == (1, 0) for found in placement.values())
+        assert values == [{"stem": f"Soru {i}", "confidence": 0.9} for i in range(40)]
+        assert entry[b"data"][:1] == caching._CODEC_RAW
+        assert float(entry[b"quality_score"]) == 0.9
+        assert 0 < ttl <= 120
+        assert (exists_before, deleted, exists_after) == (True, True, False)
+        assert remaining == {"stem": "Soru 1", "confidence": 0.9}
+
+    def test_bulk_set_writes_every_shard(self, fake_redis: dict):
+        """Test that a batch spanning both shards stores and expires every entry."""
+        items = [(f"question:{i}", {"stem": "x" * (i * 40)}, 60) for i in range(30)]
+
+        async def scenario():
+            cache = await _sharded_cache()
+            stored = await cache.bulk_set(items)
+            values = [await cache.get(key) for key, _, _ in items]
+            await cache.close()
+            return stored, values
+
+        stored, values = asyncio.run(scenario())
+
+        assert stored == [True] * len(items)
+        assert values == [value for _, value, _ in items]
+
+    def test_pending_hits_flush_without_resurrecting_expired_keys(self, fake_redis: dict):
+        """Test that flushed hit counts land on live entries and skip keys that expired meanwhile."""
+        async def scenario():
+            cache = await _sharded_cache()
+            await cache.set("question:live", {"stem": "a"})
+            await cache.set("question:expired", {"stem": "b"})
+            for _ in range(3):
+                await cache.get("question:live")
+            await cache.get("question:expired")
+
+            # Expire the entry behind the cache's back, as Redis would once its TTL passes
+            await cache._shard_for("question:expired").delete("question:expired")
+
+            flushed = await cache.flush_access_counts()
+            live_count = await cache._shard_for("question:live").hget("question:live", "access_count")
+            resurrected = await cache._shard_for("question:expired").exists("question:expired")
+            pending = dict(cache._pending_hits)
+            await cache.close()
+            return flushed, live_count, resurrected, pending
+
+        flushed, live_count, resurrected, pending = asyncio.run(scenario())
+
+        assert flushed == 2
+        assert int(live_count) == 3
+        assert resurrected == 0
+        assert pending == {}
+
+    def test_clear_cache_scans_every_shard(self, fake_redis: dict):
+        """Test that pattern clearing deletes matching keys on both shards in SCAN batches."""
+        question_keys = [f"question:{i}" for i in range(25)]
+        other_keys = [f"pool:{i}" for i in range(10)]
+
+        async def scenario():
+            manager = QuestionCacheManager()
+            manager.CLEAR_BATCH_SIZE = 4
+            manager.cache = await _sharded_cache()
+            manager.is_redis = True
+            await manager.cache.bulk_set([(key, {"stem": key}, 60) for key in question_keys + other_keys])
+
+            cleared = await manager.clear_cache("question:*")
+            left = [await manager.cache.exists(key) for key in question_keys + other_keys]
+            await manager.cache.close()
+            return cleared, left
+
+        cleared, left = asyncio.run(scenario())
+
+        assert cleared is True
+        assert left == [False] * len(question_keys) + [True] * len(other_keys)
+
+
+class TestGenerateOnce:
+    """Test singleflight generation through generate_once."""
+
+    def test_cancelled_leader_does_not_cancel_followers(self, manager: QuestionCacheManager):
+        """Test that cancelling the first caller still resolves and caches the shared generation."""
+        calls = []
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def generate():
+                calls.append(1)
+                await release.wait()
+                return {"stem": "Soru"}
+
+            args = ("Matematik", "Kesirler", "Kesirlerle toplama yapar", "ORTA", generate)
+            leader = asyncio.create_task(manager.generate_once(*args))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(manager.generate_once(*args)) for _ in range(3)]
+            await asyncio.sleep(0)
+
+            leader.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            results = await asyncio.gather(*followers)
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            cached = await manager.get_cached_question(*args[:4])
+            return results, cached
+
+        results, cached = asyncio.run(scenario())
+
+        assert results == [{"stem": "Soru"}] * 3
+        assert len(calls) == 1
+        assert cached["stem"] == "Soru"
+        assert manager._inflight == {}
+
+    def test_failed_generation_reaches_every_caller(self, manager: QuestionCacheManager):
+        """Test that an exception is raised in every waiter and the next call starts afresh."""
+        async def scenario():
+            async def fail():
+                await asyncio.sleep(0)
+                raise RuntimeError("model unavailable")
+
+            args = ("Matematik", "Kesirler", "Kesirlerle toplama yapar", "ORTA")
+            results = await asyncio.gather(
+                manager.generate_once(*args, fail), manager.generate_once(*args, fail),
+                return_exceptions=True,
+            )
+
+            async def succeed():
+                return {"stem": "Soru"}
+
+            return results, await manager.generate_once(*args, succeed)
+
+        results, retried = asyncio.run(scenario())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert retried == {"stem": "Soru"}
+
+
+class TestShutdown:
+    """Test that shutdown sends writes still queued in the background writer."""
+
+    def test_close_cache_manager_flushes_queued_writes(self, fake_redis: dict, monkeypatch):
+        """Test that questions queued for the writer task are in Redis once close_cache_manager returns."""
+        async def scenario():
+            manager = QuestionCacheManager()
+            manager.cache = await _sharded_cache()
+            manager.is_redis = True
+            monkeypatch.setattr(caching, "cache_manager", manager)
+
+            combos = [("Matematik", f"Konu {i}", "Kazanım", "ORTA") for i in range(10)]
+            for combo in combos:
+                assert await manager.cache_question({"stem": combo[1]}, *combo)
+            await caching.close_cache_manager()
+
+            # Read the shards directly; close() released the cache's own clients
+            stored = []
+            for combo in combos:
+                key = manager.generate_cache_key(*combo)
+                shard = fakeredis.FakeAsyncRedis(server=fake_redis[SHARDS[manager.cache._shard_index(key)]])
+                stored.append(await shard.exists(key))
+            return stored, manager.cache.shards
+
+        stored, shards = asyncio.run(scenario())
+
+        assert stored == [1] * 10
+        assert shards == []
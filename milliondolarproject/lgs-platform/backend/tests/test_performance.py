@@ -0,0 +1,209 @@
+"""
+Performance tracker tests.
+Tests the streaming per-question aggregates, the discrimination index, the bounded
+answer buffer with its on-disk spill, and the derived-result cache.
+"""
+import asyncio
+import json
+import random
+import statistics
+
+import pytest
+
+from app.core.performance import PerformanceTracker, QuestionAggState, StudentAnswer
+
+
+class SmallBufferTracker(PerformanceTracker):
+    """Tracker with a buffer small enough to spill in a test."""
+    MAX_IN_MEMORY_ANSWERS = 20
+    SPILL_BATCH = 5
+
+
+def _answer(i: int, question_id: str = "q1", student_id: str = "s1", time_spent: int = 30,
+            is_correct: bool = True, subject: str = "Matematik") -> StudentAnswer:
+    return StudentAnswer(
+        student_id=student_id,
+        question_id=question_id,
+        selected_answer="A" if is_correct else "B",
+        correct_answer="A",
+        is_correct=is_correct,
+        time_spent_seconds=time_spent,
+        timestamp=float(i),
+        session_id="session_1",
+        subject=subject,
+        topic="Kesirler",
+        difficulty="ORTA",
+        question_source="LGS",
+    )
+
+
+def _record_abilities(tracker: PerformanceTracker, student_count: int = 10, warmup: int = 100):
+    """Give student i an ability of i / student_count from warmup questions in the same subject."""
+    for student in range(student_count):
+        for j in range(warmup):
+            tracker.record_answer(_answer(j, question_id=f"w{j}", student_id=f"s{student}",
+                                          is_correct=j < warmup * student // student_count))
+
+
+class TestQuestionAggregates:
+    """Test the running mean, standard deviation and median of time spent."""
+
+    @pytest.mark.parametrize("count", [1, 2, 7, 8, 101, 200])
+    def test_matches_statistics_module(self, count: int):
+        """Test the streaming values against statistics for odd and even answer counts."""
+        rng = random.Random(count)
+        times = [rng.choice([rng.randint(5, 300), 60]) for _ in range(count)]
+
+        agg = QuestionAggState()
+        for i, t in enumerate(times):
+            agg.add(_answer(i, time_spent=t))
+
+        assert agg.total_attempts == count
+        assert agg.mean_time == pytest.approx(statistics.mean(times))
+        assert agg.median_time == statistics.median(times)
+        if count > 1:
+            assert agg.std_time == pytest.approx(statistics.stdev(times))
+        else:
+            assert agg.std_time == 0
+
+    def test_median_after_each_answer(self):
+        """Test that the two heaps stay balanced as sorted and reversed runs arrive."""
+        times = list(range(1, 11)) + list(range(30, 20, -1)) + [15] * 5
+        agg = QuestionAggState()
+        for i, t in enumerate(times):
+            agg.add(_answer(i, time_spent=t))
+            assert agg.median_time == statistics.median(times[:i + 1])
+
+
+class TestDiscriminationIndex:
+    """Test the 27% upper/lower group discrimination index and when it is recomputed."""
+
+    def test_top_and_bottom_27_percent_groups(self):
+        """Test that only the two strongest and two weakest of ten students are counted."""
+        tracker = PerformanceTracker()
+        _record_abilities(tracker)
+
+        # Middle students answering correctly must not count towards either group
+        for student in range(10):
+            tracker.record_answer(_answer(200, question_id="qt", student_id=f"s{student}",
+                                          is_correct=student != 1))
+
+        agg = tracker.question_aggregates["qt"]
+        assert tracker._calculate_discrimination_index(agg) == pytest.approx((2 - 1) / 2)
+
+    @pytest.mark.parametrize("strong_correct, expected", [(True, 1.0), (False, -1.0)])
+    def test_repeated_answers_are_clamped(self, strong_correct: bool, expected: float):
+        """Test that repeat attempts pushing the raw index past +/-1 are clamped."""
+        tracker = PerformanceTracker()
+        _record_abilities(tracker)
+
+        for student in range(10):
+            strong, weak = student >= 8, student <= 1
+            repeats = 3 if strong or weak else 1
+            is_correct = strong_correct if strong else (not strong_correct if weak else True)
+            for _ in range(repeats):
+                tracker.record_answer(_answer(200, question_id="qt", student_id=f"s{student}",
+                                              is_correct=is_correct))
+
+        agg = tracker.question_aggregates["qt"]
+        assert tracker._calculate_discrimination_index(agg) == expected
+
+    def test_too_few_students_is_neutral(self):
+        """Test that fewer than six ranked students give the neutral 0.5."""
+        tracker = PerformanceTracker()
+        for i in range(12):
+            tracker.record_answer(_answer(i, question_id="qt", student_id=f"s{i % 5}", is_correct=i % 2 == 0))
+
+        assert tracker._calculate_discrimination_index(tracker.question_aggregates["qt"]) == 0.5
+
+    def test_recomputed_on_doubling_and_staleness(self):
+        """Test the recompute points and that the memoized value is reported in between."""
+        recomputed_at = []
+
+        class CountingTracker(PerformanceTracker):
+            DISCRIMINATION_MAX_STALE_ATTEMPTS = 50
+
+            def _calculate_discrimination_index(self, agg):
+                recomputed_at.append(agg.total_attempts)
+                return 0.1 * len(recomputed_at)
+
+        tracker = CountingTracker()
+        for i in range(250):
+            tracker.record_answer(_answer(i, question_id="qt", student_id=f"s{i % 12}", is_correct=i % 3 > 0))
+            performance = tracker.question_performance["qt"]
+            if i + 1 < tracker.MIN_DISCRIMINATION_ATTEMPTS:
+                assert performance.discrimination_index == 0.5
+            else:
+                assert performance.discrimination_index == pytest.approx(0.1 * len(recomputed_at))
+
+        assert recomputed_at == [10, 20, 40, 80, 130, 180, 230]
+
+
+class TestAnswerSpill:
+    """Test eviction of raw answers past MAX_IN_MEMORY_ANSWERS."""
+
+    def test_without_spill_path_answers_stay_in_memory(self):
+        """Test that nothing is evicted when there is nowhere to spill to."""
+        tracker = SmallBufferTracker()
+        for i in range(30):
+            tracker.record_answer(_answer(i))
+
+        assert len(tracker.answers) == 30
+
+    def test_evicted_answers_are_appended_in_order(self, tmp_path):
+        """Test that evicted answers reach the spill file oldest first, outside an event loop."""
+        spill_path = tmp_path / "spill.jsonl"
+        tracker = SmallBufferTracker(spill_path=str(spill_path))
+        for i in range(30):
+            tracker.record_answer(_answer(i))
+
+        spilled = [json.loads(line) for line in spill_path.read_text(encoding="utf-8").splitlines()]
+        assert [a["timestamp"] for a in spilled] == [float(i) for i in range(10)]
+        assert [a.timestamp for a in tracker.answers] == [float(i) for i in range(10, 30)]
+
+    def test_spill_runs_in_background_on_event_loop(self, tmp_path):
+        """Test that spills queued inside an event loop are written by flush_spill."""
+        spill_path = tmp_path / "spill.jsonl"
+
+        async def record_all():
+            tracker = SmallBufferTracker(spill_path=str(spill_path))
+            for i in range(30):
+                tracker.record_answer(_answer(i))
+            await tracker.flush_spill()
+            return tracker
+
+        tracker = asyncio.run(record_all())
+
+        assert len(spill_path.read_text(encoding="utf-8").splitlines()) == 10
+        assert tracker._pending_spill == []
+
+    def test_spill_failure_keeps_answer_recorded(self, tmp_path):
+        """Test that an unwritable spill path is logged without losing the answer's aggregates."""
+        tracker = SmallBufferTracker(spill_path=str(tmp_path / "missing" / "spill.jsonl"))
+        for i in range(21):
+            tracker.record_answer(_answer(i))
+
+        assert tracker._total_answers == 21
+        assert tracker.question_performance["q1"].total_attempts == 21
+
+
+class TestResultCache:
+    """Test caching of derived results and their invalidation by question and student."""
+
+    def test_distractor_analysis_is_cached_until_question_is_answered(self):
+        """Test that only a new answer to the same question drops its cached analysis."""
+        tracker = PerformanceTracker()
+        tracker.record_answer(_answer(0, question_id="q1", is_correct=False))
+        tracker.record_answer(_answer(1, question_id="q10"))
+
+        analysis = tracker.analyze_distractor_effectiveness("q1")
+        assert tracker.analyze_distractor_effectiveness("q1") is analysis
+
+        tracker.record_answer(_answer(2, question_id="q10", student_id="s2"))
+        assert tracker.analyze_distractor_effectiveness("q1") is analysis
+
+        tracker.record_answer(_answer(3, question_id="q1", student_id="s2"))
+        refreshed = tracker.analyze_distractor_effectiveness("q1")
+        assert refreshed is not analysis
+        assert refreshed["total_attempts"] == 2
+        assert refreshed["option_distribution"]["A"]["count"] == 1
@@ -0,0 +1,107 @@
+"""
+Question generation cache tests.
+Tests that near-duplicate requests share cached questions and distinct learning outcomes never do,
+and that the on-disk copy of the cache is written before shutdown.
+"""
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from app.core.question_generation import (  # noqa: E402
+    DifficultyLevel,
+    EnhancedQuestionGenerator,
+    GenerationRequest,
+    QuestionType,
+)
+
+
+@pytest.fixture
+def generator() -> EnhancedQuestionGenerator:
+    """Provide a generator without on-disk cache persistence."""
+    os.environ.pop("GENERATION_CACHE_PATH", None)
+    return EnhancedQuestionGenerator()
+
+
+def _request(topic: str, learning_outcome: str,
+             question_type: QuestionType = QuestionType.MULTIPLE_CHOICE) -> GenerationRequest:
+    return GenerationRequest(
+        subject="Matematik",
+        topic=topic,
+        learning_outcome=learning_outcome,
+        difficulty=DifficultyLevel.MEDIUM,
+        question_type=question_type,
+    )
+
+
+def _store(generator: EnhancedQuestionGenerator, request: GenerationRequest) -> dict:
+    question = {"stem": f"{request.topic} / {request.learning_outcome}"}
+    generator._store_cache(generator._generate_cache_key(request), request, question)
+    return question
+
+
+def _lookup(generator: EnhancedQuestionGenerator, request: GenerationRequest):
+    return generator._lookup_cache(generator._generate_cache_key(request), request)
+
+
+class TestNearDuplicateCache:
+    """Test the near-duplicate tier of the generation cache."""
+
+    def test_casing_punctuation_and_suffixes_share_entry(self, generator: EnhancedQuestionGenerator):
+        """Test that requests differing only in casing, punctuation or suffixes reuse the cached question."""
+        question = _store(generator, _request("Kesirler", "Kesirlerle toplama işlemi yapar."))
+
+        assert _lookup(generator, _request("KESİRLER", "kesirlerle toplama işlemi yapar")) is question
+        assert _lookup(generator, _request("Kesirler", "Kesirlerle toplama işlemini yapar.")) is question
+
+    def test_distinct_learning_outcomes_never_share_entry(self, generator: EnhancedQuestionGenerator):
+        """Test that different learning outcomes, including ones differing only by code, get separate entries."""
+        outcomes = [
+            "M.8.1.1.1 Verilen pozitif tam sayıların çarpanlarını bulur",
+            "M.8.1.1.2 Verilen pozitif tam sayıların katlarını bulur",
+            "M.8.1.2.1 Verilen pozitif tam sayıların çarpanlarını bulur",
+            "M.8.1.2.3 Verilen pozitif tam sayıların çarpanlarını bulur",
+            "Verilen pozitif tam sayıların çarpanlarını bulur",
+        ]
+        stored = [_store(generator, _request("Çarpanlar ve katlar", outcome)) for outcome in outcomes]
+
+        for outcome, question in zip(outcomes, stored):
+            assert _lookup(generator, _request("Çarpanlar ve katlar", outcome)) is question
+
+        for index, outcome in enumerate(outcomes):
+            fresh = EnhancedQuestionGenerator()
+            for other_index, other in enumerate(outcomes):
+                if other_index != index:
+                    _store(fresh, _request("Çarpanlar ve katlar", other))
+            assert _lookup(fresh, _request("Çarpanlar ve katlar", outcome)) is None
+
+    def test_question_type_is_part_of_the_match(self, generator: EnhancedQuestionGenerator):
+        """Test that a cached multiple-choice question is not reused for another question type."""
+        _store(generator, _request("Kesirler", "Kesirlerle toplama işlemi yapar."))
+
+        request = _request("Kesirler", "Kesirlerle toplama işlemi yapar.", QuestionType.TRUE_FALSE)
+        assert _lookup(generator, request) is None
+
+
+class TestPersistedCache:
+    """Test the on-disk copy of the generation cache."""
+
+    def test_flush_persisted_cache_writes_queued_rows(self, tmp_path):
+        """Test that rows queued on the event loop are on disk once flush_persisted_cache returns."""
+        cache_path = str(tmp_path / "generation_cache.sqlite3")
+
+        async def store_and_flush():
+            generator = EnhancedQuestionGenerator(cache_path=cache_path)
+            for topic in ("Kesirler", "Üslü sayılar", "Olasılık"):
+                _store(generator, _request(topic, f"{topic} konusunu kavrar."))
+            await generator.flush_persisted_cache()
+
+        asyncio.run(store_and_flush())
+
+        warm = EnhancedQuestionGenerator(cache_path=cache_path)
+        assert _lookup(warm, _request("Olasılık", "Olasılık konusunu kavrar.")) == {
+            "stem": "Olasılık / Olasılık konusunu kavrar."
+        }
+        assert len(warm.generation_cache) == 3
@@ -0,0 +1,145 @@
+"""
+Teacher alert tests.
+Tests the priority ordering of active alerts and the streamed alerts listing.
+"""
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import teachers
+from app.core import teacher_analytics
+from app.core.teacher_analytics import AlertType, QuestionSubmission, TeacherAnalyticsEngine, get_teacher_analytics
+from app.main import app
+
+SEVERITY_RANK = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+
+
+@pytest.fixture
+def engine() -> TeacherAnalyticsEngine:
+    """Provide an engine with one teacher owning a class of ten students."""
+    engine = TeacherAnalyticsEngine()
+    engine.register_teacher_access("teacher_001", ["class_8A"], ["Matematik"], is_homeroom=True)
+    engine.add_students_to_class("teacher_001", "class_8A", [f"student_{i:03d}" for i in range(10)])
+    return engine
+
+
+def _add_alert(engine: TeacherAnalyticsEngine, severity: str, created_at: float, student: int = 0):
+    submission = QuestionSubmission(
+        submission_id=f"sub_{len(engine.active_alerts)}",
+        student_id=f"student_{student:03d}",
+        question_id="q_1000",
+        class_id="class_8A",
+        subject="Matematik",
+        topic="Kesirler",
+        learning_outcome="Kesirlerle toplama yapar",
+        difficulty="ORTA",
+        selected_answer="B",
+        correct_answer="A",
+        is_correct=False,
+        time_spent_seconds=60,
+        timestamp=created_at,
+        session_id="session_1",
+        teacher_id="teacher_001",
+    )
+    with patch.object(teacher_analytics.time, "time", return_value=created_at):
+        engine._create_alert(AlertType.LOW_ACCURACY, submission, severity, f"{severity} alert {len(engine.active_alerts)}")
+    return engine.active_alerts[-1]
+
+
+def _add_mixed_alerts(engine: TeacherAnalyticsEngine, count: int):
+    """Add alerts cycling through severities and a handful of timestamps, so ties are common."""
+    severities = ["low", "critical", "medium", "high"]
+    for i in range(count):
+        _add_alert(engine, severities[i % 4], 1000.0 + (i * 7) % 5, student=i % 10)
+
+
+def _reference_order(alerts):
+    """The ordering the endpoint used before alerts were kept sorted."""
+    return sorted(alerts, key=lambda a: (SEVERITY_RANK.get(a.severity, 0), a.created_at), reverse=True)
+
+
+class TestAlertPriority:
+    """Test the bisect-maintained alert ordering."""
+
+    def test_ordering_matches_stable_sort(self, engine: TeacherAnalyticsEngine):
+        """Test severity-then-recency order, with ties kept in creation order."""
+        _add_mixed_alerts(engine, 60)
+
+        ordered = engine.get_alerts_by_priority()
+
+        assert ordered == _reference_order(engine.active_alerts)
+        assert [a.severity for a in ordered[:2]] == ["critical", "critical"]
+
+    def test_ties_keep_creation_order(self, engine: TeacherAnalyticsEngine):
+        """Test that alerts with the same severity and timestamp come back oldest first."""
+        first = _add_alert(engine, "high", 1000.0, student=1)
+        second = _add_alert(engine, "high", 1000.0, student=2)
+        newer = _add_alert(engine, "high", 1001.0, student=3)
+
+        assert engine.get_alerts_by_priority() == [newer, first, second]
+
+    @pytest.mark.parametrize("severity", ["critical", "high", "medium", "low", "unknown"])
+    def test_severity_filter(self, engine: TeacherAnalyticsEngine, severity: str):
+        """Test that filtering returns exactly that severity's alerts in priority order."""
+        _add_mixed_alerts(engine, 40)
+
+        expected = [a for a in _reference_order(engine.active_alerts) if a.severity == severity]
+        assert engine.get_alerts_by_priority(severity) == expected
+
+    def test_resolve_removes_only_that_alert(self, engine: TeacherAnalyticsEngine):
+        """Test that resolving drops the alert from the ordering, even among identical keys."""
+        _add_mixed_alerts(engine, 40)
+        twin_a = _add_alert(engine, "medium", 1002.0, student=4)
+        twin_b = _add_alert(engine, "medium", 1002.0, student=4)
+
+        engine.resolve_alert(twin_b)
+        engine.resolve_alert(engine.get_alerts_by_priority("critical")[0])
+
+        remaining = engine.get_alerts_by_priority()
+        assert twin_b not in remaining and twin_a in remaining
+        assert len(remaining) == 40
+        assert remaining == _reference_order([a for a in engine.active_alerts if a.is_active])
+
+
+class TestAlertListing:
+    """Test the /alerts endpoint's streamed and regular responses."""
+
+    @pytest.fixture
+    def client(self, engine: TeacherAnalyticsEngine):
+        app.dependency_overrides[get_teacher_analytics] = lambda: engine
+        yield TestClient(app)
+        app.dependency_overrides.pop(get_teacher_analytics, None)
+
+    def test_streamed_listing_matches_regular_response(self, engine: TeacherAnalyticsEngine, client: TestClient,
+                                                       monkeypatch):
+        """Test that a listing over the stream threshold parses to the same JSON as the regular path."""
+        count = teachers.ALERT_STREAM_THRESHOLD + 100
+        _add_mixed_alerts(engine, count)
+        engine.resolve_alert(engine.get_alerts_by_priority()[0])
+
+        streamed = client.get("/api/v1/teachers/alerts")
+        monkeypatch.setattr(teachers, "ALERT_STREAM_THRESHOLD", 10_000)
+        regular = client.get("/api/v1/teachers/alerts")
+
+        assert streamed.status_code == regular.status_code == 200
+        assert "content-length" not in streamed.headers
+        assert streamed.json() == regular.json()
+
+        body = streamed.json()
+        assert body["total_count"] == len(body["alerts"]) == count - 1
+        assert [a["alert_id"] for a in body["alerts"]] == [
+            a.alert_id for a in _reference_order(engine.active_alerts) if a.is_active
+        ]
+
+    def test_streamed_listing_with_severity_filter(self, engine: TeacherAnalyticsEngine, client: TestClient,
+                                                   monkeypatch):
+        """Test that a filtered listing reports counts for the filtered alerts only."""
+        monkeypatch.setattr(teachers, "ALERT_STREAM_THRESHOLD", 5)
+        _add_mixed_alerts(engine, 40)
+
+        body = client.get("/api/v1/teachers/alerts", params={"severity": "critical"}).json()
+
+        assert body["total_count"] == body["critical_count"] == 10
+        assert body["high_count"] == 0
+        assert {a["severity"] for a in body["alerts"]} == {"critical"}